@@ -0,0 +1,107 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+
+
+def user_data(user):
+    return {
+        'id': user.pk,
+        'username': user.username,
+        'full_name': user.get_full_name(),
+    }
+
+
+def group_data(group):
+    if group is None:
+        return None
+    return {'id': group.pk, 'slug': group.slug, 'title': group.title}
+
+
+class Serializer:
+    """Набор полей объекта, из которого ?fields= выбирает нужные.
+
+    У каждого поля могут быть select_related и аннотации: они
+    добавляются в запрос, только если поле запрошено, поэтому
+    вложенные автор и группа грузятся тем же запросом, а лишние
+    JOIN и подсчёты не выполняются.
+    """
+
+    fields = {}
+    select_related = {}
+    annotations = {}
+
+    def __init__(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            self.names = list(self.fields)
+            return
+        self.names = [name for name in requested.split(',') if name]
+        unknown = set(self.names) - set(self.fields)
+        if unknown:
+            raise ValidationError(
+                f'Неизвестные поля: {", ".join(sorted(unknown))}'
+            )
+
+    def prepare(self, queryset):
+        related = [
+            self.select_related[name] for name in self.names
+            if name in self.select_related
+        ]
+        if related:
+            queryset = queryset.select_related(*related)
+        annotations = {}
+        for name in self.names:
+            annotations.update(self.annotations.get(name, {}))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def one(self, instance):
+        return {name: self.fields[name](instance) for name in self.names}
+
+    def many(self, instances):
+        return [self.one(instance) for instance in instances]
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': lambda post: post.pk,
+        'text': lambda post: post.text,
+        'html': lambda post: str(post.body_html),
+        'pub_date': lambda post: post.pub_date,
+        'author': lambda post: user_data(post.author),
+        'group': lambda post: group_data(post.group),
+        'image': lambda post: post.image.url if post.image else None,
+        'comments': lambda post: post.comments_count,
+    }
+    select_related = {'author': 'author', 'group': 'group'}
+    annotations = {'comments': {'comments_count': Count('comments')}}
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': lambda comment: comment.pk,
+        'post': lambda comment: comment.post_id,
+        'parent': lambda comment: comment.parent_id,
+        'depth': lambda comment: comment.depth,
+        'text': lambda comment: comment.text,
+        'created': lambda comment: comment.created,
+        'author': lambda comment: user_data(comment.author),
+    }
+    select_related = {'author': 'author'}
+
+
+class GroupSerializer(Serializer):
+    fields = {
+        'id': lambda group: group.pk,
+        'slug': lambda group: group.slug,
+        'title': lambda group: group.title,
+        'description': lambda group: group.description,
+    }
+
+
+class FollowSerializer(Serializer):
+    fields = {
+        'id': lambda follow: follow.pk,
+        'author': lambda follow: user_data(follow.author),
+    }
+    select_related = {'author': 'author'}
@@ -0,0 +1,240 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from http import HTTPStatus
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def cursors(*values):
+    return [
+        base64.urlsafe_b64encode(value.encode()).decode()
+        for value in values
+    ]
+
+
+MALFORMED_CURSORS = {
+    'api:posts': cursors(
+        '5', '{}', '[]', '[5]', '[null, 1]',
+        '["2020-01-01T00:00:00"]', '["2020-13-45T00:00:00", 1]',
+        '["2020-01-01T00:00:00", "abc"]', '["2020-01-01T00:00:00", 1, 2]',
+    ),
+    'api:groups': cursors(
+        '5', '{}', '[]', '["abc"]', '[null]', '[true]', '[1, 2]',
+    ),
+}
+
+
+class ApiTestClass(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group
+            )
+            for index in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()
+
+    def test_cursor_pagination_walks_all_posts(self):
+        """Курсор проходит все посты без повторов и пропусков."""
+        url = reverse('api:posts')
+        seen = []
+        params = {'limit': 2, 'fields': 'id'}
+        while url:
+            data = self.get_json(url, **params)
+            seen += [post['id'] for post in data['results']]
+            url, params = data['next'], {}
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_malformed_cursor(self):
+        """Курсор неверной формы отклоняется с кодом 400, а не 500."""
+        for view_name, malformed in MALFORMED_CURSORS.items():
+            url = reverse(view_name)
+            for cursor in malformed:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.BAD_REQUEST
+                    )
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только запрошенные поля."""
+        data = self.get_json(reverse('api:posts'), fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_embedded_author_and_group_in_one_query(self):
+        """Автор, группа и число комментариев грузятся одним запросом."""
+        with self.assertNumQueries(1):
+            data = self.get_json(reverse('api:posts'))
+        post = data['results'][-1]
+        self.assertEqual(post['author']['full_name'], 'Лев Толстой')
+        self.assertEqual(post['group']['slug'], self.group.slug)
+        self.assertEqual(post['comments'], 1)
+
+    def test_etag_returns_not_modified(self):
+        """Совпавший ETag даёт 304 без тела."""
+        url = reverse('api:post_detail', args=(self.posts[0].pk,))
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_create_post_uses_form_validation(self):
+        """Создание поста проверяется PostForm."""
+        url = reverse('api:posts')
+        response = self.client.post(url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.reader_client.post(
+            url, json.dumps({'text': ''}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        response = self.reader_client.post(
+            url,
+            json.dumps({'text': 'Из API', 'group': self.group.pk}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertTrue(Post.objects.filter(
+            text='Из API', author=self.reader, group=self.group
+        ).exists())
+
+    def test_only_author_edits_post(self):
+        """PATCH меняет только переданные поля и доступен только автору."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', args=(post.pk,))
+        payload = json.dumps({'text': 'Исправлено'})
+        response = self.reader_client.patch(
+            url, payload, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.author_client.patch(
+            url, payload, content_type='application/json'
+        )
+        self.assertEqual(response.json()['text'], 'Исправлено')
+        post.refresh_from_db()
+        self.assertEqual(post.group, self.group)
+
+    def test_form_encoded_patch_and_put(self):
+        """PATCH и PUT принимают тело формы, прочие форматы — 415."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', args=(post.pk,))
+        response = self.author_client.patch(
+            url, 'text=%D0%98%D0%B7+%D1%84%D0%BE%D1%80%D0%BC%D1%8B',
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.json()['text'], 'Из формы')
+        response = self.author_client.put(
+            url, 'text=PUT', content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.group), ('PUT', None))
+        response = self.author_client.patch(
+            url, 'text', content_type='text/plain'
+        )
+        self.assertEqual(
+            response.status_code, HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        )
+
+    def test_missing_objects_return_json_404(self):
+        """Несуществующие пост, группа и автор дают 404 в JSON."""
+        urls = [
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:comments', args=(0,)),
+            reverse('api:group_detail', args=('missing',)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+        response = self.reader_client.post(
+            reverse('api:follows'), json.dumps({'author': 'missing'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertIn('detail', response.json())
+
+    def test_comments(self):
+        """Комментарии создаются через CommentForm и читаются списком."""
+        url = reverse('api:comments', args=(self.posts[1].pk,))
+        response = self.reader_client.post(
+            url, json.dumps({'text': 'Ответ'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = self.get_json(url)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']], ['Ответ']
+        )
+        parent = data['results'][0]['id']
+        response = self.reader_client.post(
+            url, json.dumps({'text': 'Ответ на ответ', 'parent': parent}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['depth'], 1)
+        response = self.reader_client.post(
+            reverse('api:comments', args=(self.posts[0].pk,)),
+            json.dumps({'text': 'Не туда', 'parent': parent}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_follows(self):
+        """Подписка создаётся, показывается в списке и удаляется."""
+        url = reverse('api:follows')
+        response = self.reader_client.post(
+            url, json.dumps({'author': self.author.username}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = self.get_json(url, client=self.reader_client)
+        self.assertEqual(
+            data['results'][0]['author']['username'], self.author.username
+        )
+        response = self.reader_client.delete(
+            reverse('api:follow_detail', args=(self.author.username,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_groups(self):
+        """Группы доступны списком и по slug."""
+        data = self.get_json(reverse('api:groups'))
+        self.assertEqual(data['results'][0]['slug'], self.group.slug)
+        data = self.get_json(
+            reverse('api:group_detail', args=(self.group.slug,))
+        )
+        self.assertEqual(data['title'], self.group.title)
@@ -0,0 +1,229 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_http_methods
+
+from core.pagination import CursorPaginator
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post
+from posts.threads import reply_parent
+
+from .serializers import (
+    CommentSerializer, FollowSerializer, GroupSerializer, PostSerializer
+)
+
+User = get_user_model()
+
+JSON_CONTENT_TYPE = 'application/json'
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+post_pages = CursorPaginator('pub_date', parse=parse_datetime)
+comment_pages = CursorPaginator('created', parse=parse_datetime)
+id_pages = CursorPaginator(descending=False)
+
+
+class UnsupportedMediaType(Exception):
+    """Тело запроса в формате, который API не разбирает."""
+
+
+def json_response(request, data, status=200):
+    """Компактный JSON с ETag: совпавший If-None-Match даёт 304
+    без тела."""
+    content = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+    response = HttpResponse(
+        content, status=status, content_type=JSON_CONTENT_TYPE
+    )
+    if request.method in ('GET', 'HEAD') and status == 200:
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+        response['ETag'] = etag
+        response = get_conditional_response(
+            request, etag=etag, response=response
+        )
+    return response
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def form_errors(form):
+    return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+
+def request_data(request):
+    if request.content_type == JSON_CONTENT_TYPE:
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ValidationError('Тело запроса не является JSON')
+        if not isinstance(data, dict):
+            raise ValidationError('Ожидается JSON-объект')
+        return data
+    if request.method == 'POST':
+        return request.POST.dict()
+    # Django разбирает тело формы только у POST
+    if request.content_type == FORM_CONTENT_TYPE or not request.body:
+        return QueryDict(request.body, encoding=request.encoding).dict()
+    raise UnsupportedMediaType(
+        f'Тело {request.method} принимается как JSON или форма'
+    )
+
+
+def api_view(*methods, login=()):
+    """require_http_methods плюс ответы об ошибках в JSON: 400 для
+    ValidationError, 415 для UnsupportedMediaType и 401 для
+    анонимного пользователя на методах из login."""
+    def decorator(view):
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in login and not request.user.is_authenticated:
+                return error('Требуется авторизация', 401)
+            try:
+                return view(request, *args, **kwargs)
+            except ValidationError as exc:
+                return error(' '.join(exc.messages), 400)
+            except UnsupportedMediaType as exc:
+                return error(str(exc), 415)
+        return wrapper
+    return decorator
+
+
+def page(request, paginator, queryset, serializer):
+    items, cursor = paginator.paginate(serializer.prepare(queryset), request)
+    next_url = None
+    if cursor:
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}'
+        )
+    return json_response(request, {
+        'next': next_url,
+        'results': serializer.many(items),
+    })
+
+
+@api_view('GET', 'POST', login=('POST',))
+def posts(request):
+    serializer = PostSerializer(request)
+    if request.method == 'POST':
+        form = PostForm(request_data(request), files=request.FILES or None)
+        if not form.is_valid():
+            return form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        post = serializer.prepare(Post.objects).get(pk=post.pk)
+        return json_response(request, serializer.one(post), status=201)
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return page(request, post_pages, queryset, serializer)
+
+
+@api_view('GET', 'PATCH', 'PUT', 'DELETE', login=('PATCH', 'PUT', 'DELETE'))
+def post_detail(request, post_id):
+    serializer = PostSerializer(request)
+    post = serializer.prepare(Post.objects).filter(pk=post_id).first()
+    if post is None:
+        return error('Пост не найден', 404)
+    if request.method == 'GET':
+        return json_response(request, serializer.one(post))
+    if post.author_id != request.user.pk:
+        return error('Изменять пост может только автор', 403)
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    data = request_data(request)
+    if request.method == 'PATCH':
+        data = {'text': post.text, 'group': post.group_id, **data}
+    form = PostForm(data, files=request.FILES or None, instance=post)
+    if not form.is_valid():
+        return form_errors(form)
+    form.save()
+    post = serializer.prepare(Post.objects).get(pk=post.pk)
+    return json_response(request, serializer.one(post))
+
+
+@api_view('GET', 'POST', login=('POST',))
+def comments(request, post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return error('Пост не найден', 404)
+    serializer = CommentSerializer(request)
+    if request.method == 'POST':
+        data = request_data(request)
+        form = CommentForm(data)
+        if not form.is_valid():
+            return form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.parent = reply_parent(post, data.get('parent'))
+        comment.save()
+        return json_response(request, serializer.one(comment), status=201)
+    return page(
+        request, comment_pages,
+        Comment.objects.filter(post=post), serializer,
+    )
+
+
+@api_view('GET')
+def groups(request):
+    return page(request, id_pages, Group.objects.all(), GroupSerializer(
+        request
+    ))
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error('Группа не найдена', 404)
+    return json_response(request, GroupSerializer(request).one(group))
+
+
+@api_view('GET', 'POST', login=('GET', 'POST'))
+def follows(request):
+    serializer = FollowSerializer(request)
+    if request.method == 'POST':
+        username = request_data(request).get('author')
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            return error('Автор не найден', 404)
+        if author == request.user:
+            return error('Нельзя подписаться на себя', 400)
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        return json_response(
+            request, serializer.one(follow), status=201 if created else 200
+        )
+    return page(
+        request, id_pages,
+        Follow.objects.filter(user=request.user), serializer,
+    )
+
+
+@api_view('DELETE', login=('DELETE',))
+def follow_detail(request, username):
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    if not deleted:
+        return error('Подписка не найдена', 404)
+    return HttpResponse(status=204)
@@ -0,0 +1,177 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.db import connections
+from django.utils import timezone
+
+BACKUP_PAGES = 256
+BACKUP_PAUSE = 0.05
+BACKUP_KEEP = 7
+BACKUP_ROUNDS = 5
+BACKUP_RETRY_DELAY = 1
+MAX_RESTARTS = 5
+BACKUP_NAME = re.compile(r'db-\d{8}-\d{6}\.sqlite3(\.gz)?')
+
+
+class BackupError(Exception):
+    pass
+
+
+class Restarted(Exception):
+    pass
+
+
+def source_connection(alias='default'):
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise BackupError(
+            f'База {alias} не SQLite, а {connection.vendor}'
+        )
+    connection.ensure_connection()
+    return connection.connection
+
+
+def journal_mode(connection):
+    return connection.execute('PRAGMA journal_mode').fetchone()[0].lower()
+
+
+def copy_round(source, target, pages, pause, progress):
+    """Один проход копирования шагами. Возвращает число перезапусков
+    или бросает Restarted после MAX_RESTARTS."""
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] >= MAX_RESTARTS:
+                raise Restarted(state['restarts'])
+        state['remaining'] = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining:
+            time.sleep(pause)
+
+    source.backup(target, pages=pages, progress=step)
+    return state['restarts']
+
+
+def copy_pages(source, target, pages, pause, progress=None,
+               rounds=BACKUP_ROUNDS, retry_delay=BACKUP_RETRY_DELAY):
+    """Копирует базу шагами по pages страниц с паузой pause между ними.
+
+    Блокировка чтения держится только на время шага, поэтому запись
+    на сайте в паузах не ждёт. Если базу меняет другое соединение,
+    SQLite начинает копирование заново. После MAX_RESTARTS перезапусков
+    проход прерывается и начинается снова после паузы, которая растёт
+    вдвое с каждым проходом; после rounds проходов копирование
+    отменяется с BackupError. Копировать всю базу одним шагом можно
+    только в режиме WAL: там чтение не блокирует запись, а с журналом
+    отката запись на сайте ждала бы всё копирование.
+    """
+    restarts = 0
+    for attempt in range(rounds):
+        try:
+            return restarts + copy_round(
+                source, target, pages, pause, progress
+            )
+        except Restarted as restarted:
+            restarts += restarted.args[0]
+        if journal_mode(source) == 'wal':
+            source.backup(target)
+            return restarts
+        if attempt + 1 < rounds:
+            time.sleep(retry_delay * 2 ** attempt)
+    raise BackupError(
+        f'База меняется слишком часто: копирование перезапускалось '
+        f'{restarts} раз'
+    )
+
+
+def reject(path):
+    """Убирает копию, не прошедшую проверку, из ротации: файл с
+    суффиксом .bad не считается копией и остаётся для разбора."""
+    bad_path = f'{path}.bad'
+    os.replace(path, bad_path)
+    return bad_path
+
+
+def check_backup(path, alias='default'):
+    """Проверка восстановления: копия открывается как отдельная база,
+    проходит integrity_check и содержит все таблицы исходной."""
+    with tempfile.TemporaryDirectory() as directory:
+        if path.endswith('.gz'):
+            plain = os.path.join(directory, 'restore.sqlite3')
+            with gzip.open(path, 'rb') as packed, \
+                    open(plain, 'wb') as target:
+                shutil.copyfileobj(packed, target)
+            path = plain
+        restored = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            result = [row[0] for row in restored.execute(
+                'PRAGMA integrity_check'
+            )]
+            tables = {row[0] for row in restored.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )}
+        except sqlite3.DatabaseError as error:
+            raise BackupError(f'Копия не открывается: {error}')
+        finally:
+            restored.close()
+    if result != ['ok']:
+        raise BackupError('Копия повреждена: ' + '; '.join(result))
+    expected = connections[alias].introspection.table_names()
+    missing = set(expected) - tables
+    if missing:
+        raise BackupError(
+            'В копии нет таблиц: ' + ', '.join(sorted(missing))
+        )
+
+
+def rotate(directory, keep=BACKUP_KEEP):
+    """Удаляет старые копии, оставляя keep последних. Имя содержит
+    время снимка, поэтому порядок имён совпадает с хронологическим."""
+    names = sorted(
+        name for name in os.listdir(directory)
+        if BACKUP_NAME.fullmatch(name)
+    )
+    removed = names[:-keep] if keep else names
+    for name in removed:
+        os.remove(os.path.join(directory, name))
+    return removed
+
+
+def backup(directory, compress=False, pages=BACKUP_PAGES,
+           pause=BACKUP_PAUSE, progress=None, alias='default'):
+    """Снимает согласованную копию базы в directory и возвращает
+    (путь, число перезапусков). Под своим именем файл появляется
+    только целиком."""
+    source = source_connection(alias)
+    os.makedirs(directory, exist_ok=True)
+    name = timezone.now().strftime('db-%Y%m%d-%H%M%S.sqlite3')
+    copy_path = os.path.join(directory, f'.{name}.tmp')
+    packed_path = os.path.join(directory, f'.{name}.gz.tmp')
+    try:
+        target = sqlite3.connect(copy_path)
+        try:
+            restarts = copy_pages(source, target, pages, pause, progress)
+        finally:
+            target.close()
+        if compress:
+            with open(copy_path, 'rb') as plain, \
+                    gzip.open(packed_path, 'wb') as packed:
+                shutil.copyfileobj(plain, packed)
+            path = os.path.join(directory, f'{name}.gz')
+            os.replace(packed_path, path)
+        else:
+            path = os.path.join(directory, name)
+            os.replace(copy_path, path)
+    finally:
+        for tmp_path in (copy_path, packed_path):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return path, restarts
@@ -0,0 +1,62 @@
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .instrumentation import count, timed
+from .metrics import cache_key_prefix, registry
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Учитывает время обращений к кешу, попадания и промахи."""
+
+    def get(self, key, default=None, version=None):
+        with timed('cache') as outer:
+            value = super().get(key, _missing, version)
+        if outer:
+            result = 'hit' if value is not _missing else 'miss'
+            count(f'cache_{result}s')
+            registry.inc(
+                'yatube_cache_requests_total',
+                prefix=cache_key_prefix(key), result=result,
+            )
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with timed('cache') as outer:
+            values = super().get_many(keys, version)
+        if outer:
+            count('cache_hits', len(values))
+            count('cache_misses', len(keys) - len(values))
+            for key in keys:
+                registry.inc(
+                    'yatube_cache_requests_total',
+                    prefix=cache_key_prefix(key),
+                    result='hit' if key in values else 'miss',
+                )
+        return values
+
+    def set(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set_many(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with timed('cache'):
+            return super().add(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timed('cache'):
+            return super().delete(*args, **kwargs)
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    pass
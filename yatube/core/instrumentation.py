@@ -0,0 +1,62 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Время и счётчики по видам работы в рамках одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.active = set()
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def collect_timings():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name, counted=True):
+    """Замеряет блок и увеличивает счётчик name; с counted=False
+    счётчик оставлен вызывающему, например для числа файлов.
+
+    Вложенные замеры того же вида не учитываются повторно:
+    в блок передаётся False, если он выполняется внутри такого же.
+    """
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        yield False
+        return
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield True
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+        if counted:
+            timings.counts[name] += 1
+        timings.active.discard(name)
+
+
+def count(name, amount=1):
+    timings = _current.get()
+    if timings is not None:
+        timings.counts[name] += amount
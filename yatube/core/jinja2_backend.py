@@ -0,0 +1,21 @@
+from django.template.backends.jinja2 import Jinja2, Template
+
+from .instrumentation import timed
+
+
+class TimedJinja2Template(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedJinja2(Jinja2):
+    """Jinja2 с тем же замером времени рендеринга, что и у Django."""
+
+    def from_string(self, template_code):
+        return TimedJinja2Template(self.env.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedJinja2Template(
+            super().get_template(template_name).template, self
+        )
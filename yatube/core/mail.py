@@ -0,0 +1,94 @@
+import logging
+from datetime import timedelta
+from email import message_from_bytes
+from email.message import Message
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Сохраняет письма в таблицу OutboxMessage вместо отправки.
+
+    Запрос не ждёт почтовый сервер; доставку выполняет send_outbox
+    через OUTBOX_EMAIL_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        outbox = [
+            OutboxMessage(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxMessage.objects.bulk_create(outbox)
+        return len(outbox)
+
+
+class StoredMIMEMessage(MIMEMixin, Message):
+    """Разобранное письмо с as_bytes(linesep=...), как у MIME-классов
+    Django: SMTP-бэкенд отправляет его со строками через CRLF."""
+
+
+class StoredEmailMessage(EmailMessage):
+    """Письмо из очереди: MIME уже собран при постановке в очередь."""
+
+    def __init__(self, outbox_message):
+        super().__init__(
+            from_email=outbox_message.from_email,
+            to=outbox_message.recipients.split('\n'),
+        )
+        self.raw = bytes(outbox_message.message)
+
+    def message(self):
+        return message_from_bytes(self.raw, _class=StoredMIMEMessage)
+
+
+def delivery_connection():
+    return get_connection(settings.OUTBOX_EMAIL_BACKEND, fail_silently=False)
+
+
+def deliver_batch(connection, batch_size=OUTBOX_BATCH_SIZE):
+    """Отправляет пачку писем через уже открытое соединение.
+
+    Возвращает (доставлено, выбрано). Неудачные письма откладываются
+    с экспоненциально растущей паузой, после MAX_ATTEMPTS остаются
+    в таблице для разбора.
+    """
+    now = timezone.now()
+    batch = list(OutboxMessage.objects.filter(
+        attempts__lt=MAX_ATTEMPTS, next_attempt__lte=now
+    )[:batch_size])
+    delivered = []
+    for outbox_message in batch:
+        try:
+            connection.send_messages([StoredEmailMessage(outbox_message)])
+        except Exception as error:
+            logger.exception('Не удалось отправить письмо %s', outbox_message)
+            outbox_message.attempts += 1
+            outbox_message.next_attempt = now + RETRY_DELAY * 2 ** (
+                outbox_message.attempts - 1
+            )
+            outbox_message.last_error = repr(error)
+            outbox_message.save(
+                update_fields=['attempts', 'next_attempt', 'last_error']
+            )
+            connection.close()
+        else:
+            delivered.append(outbox_message.pk)
+    OutboxMessage.objects.filter(pk__in=delivered).delete()
+    return len(delivered), len(batch)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import (
+    BACKUP_KEEP, BACKUP_PAGES, BACKUP_PAUSE, BackupError, backup,
+    check_backup, reject, rotate
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает копию SQLite-базы на ходу, небольшими шагами, '
+        'не останавливая запись на сайте'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.BACKUP_DIR)
+        parser.add_argument(
+            '--compress', action='store_true', help='Сжать копию gzip'
+        )
+        parser.add_argument(
+            '--keep', type=int, default=BACKUP_KEEP,
+            help='Сколько последних копий хранить',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=BACKUP_PAGES,
+            help='Страниц базы за один шаг',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=BACKUP_PAUSE,
+            help='Пауза между шагами в секундах',
+        )
+        parser.add_argument(
+            '--no-check', action='store_true',
+            help='Не проверять, что копия восстанавливается',
+        )
+        parser.add_argument(
+            '--check', metavar='PATH',
+            help='Только проверить существующую копию',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['check']:
+                check_backup(options['check'])
+                self.stdout.write(f'Копия исправна: {options["check"]}')
+                return
+            path, restarts = backup(
+                options['dir'], options['compress'],
+                options['pages'], options['pause'],
+            )
+            if not options['no_check']:
+                try:
+                    check_backup(path)
+                except BackupError as error:
+                    raise BackupError(
+                        f'{error}. Копия сохранена как {reject(path)}'
+                    )
+        except BackupError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'Копия сохранена: {path}, перезапусков копирования: {restarts}'
+        )
+        for name in rotate(options['dir'], options['keep']):
+            self.stdout.write(f'Удалена старая копия: {name}')
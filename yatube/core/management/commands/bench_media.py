@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+
+from core.media import media_response
+
+FILE_NAME = 'bench.jpg'
+
+
+def consume(response, zero_copy):
+    """Отдаёт тело так, как это сделал бы WSGI-сервер: с zero_copy файл
+    уходит через sendfile, как в gunicorn, иначе читается в Python,
+    как в runserver."""
+    file_ = getattr(response, 'file_to_stream', None)
+    if zero_copy and file_ is not None and hasattr(file_, 'fileno'):
+        size = os.fstat(file_.fileno()).st_size
+        with open(os.devnull, 'wb') as devnull:
+            offset = 0
+            while offset < size:
+                offset += os.sendfile(
+                    devnull.fileno(), file_.fileno(), offset, size - offset
+                )
+        response.close()
+        return size
+    sent = sum(len(chunk) for chunk in response)
+    response.close()
+    return sent
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность отдачи медиафайлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-kb', type=int, default=512)
+        parser.add_argument('--requests', type=int, default=500)
+
+    def run(self, name, view, requests, zero_copy=True, **headers):
+        factory = RequestFactory()
+        sent = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            sent += consume(view(factory.get('/', **headers)), zero_copy)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<26} {requests / elapsed:>9.0f} запр/с '
+            f'{sent / elapsed / 2 ** 20:>9.0f} МБ/с'
+        )
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(root, FILE_NAME), 'wb') as bench_file:
+                bench_file.write(os.urandom(options['size_kb'] * 1024))
+            requests = options['requests']
+            with override_settings(MEDIA_ROOT=root, MEDIA_ACCEL_HEADER=''):
+                self.run('static.serve, runserver', lambda request: serve(
+                    request, FILE_NAME, document_root=root
+                ), requests, zero_copy=False)
+                self.run('serve_media', lambda request: media_response(
+                    request, FILE_NAME
+                ), requests)
+                etag = media_response(
+                    RequestFactory().get('/'), FILE_NAME
+                )['ETag']
+                self.run('serve_media, 304', lambda request: media_response(
+                    request, FILE_NAME
+                ), requests, HTTP_IF_NONE_MATCH=etag)
+            with override_settings(
+                MEDIA_ROOT=root, MEDIA_ACCEL_HEADER='X-Accel-Redirect'
+            ):
+                self.run('X-Accel-Redirect', lambda request: media_response(
+                    request, FILE_NAME
+                ), requests)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from core.orphans import (
+    BATCH_SIZE, GRACE_PERIOD, orphaned_originals, orphaned_sources,
+    orphaned_thumbnails, upload_roots
+)
+from core.storage import delete_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки и миниатюры, на которые не ссылается база, '
+        'и записи sorl об удалённых файлах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=GRACE_PERIOD.total_seconds() / 3600,
+            help='Не трогать файлы моложе этого числа часов',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def size(self, storage, name):
+        try:
+            return storage.size(name)
+        except OSError:
+            return 0
+
+    def remove(self, storage, names, delete):
+        freed = 0
+        for name in names:
+            freed += self.size(storage, name)
+            self.stdout.write(name)
+            if not self.dry_run:
+                delete(name)
+        return freed
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        grace = timedelta(hours=options['grace_hours'])
+        batch_size = options['batch_size']
+        files = freed = sources = 0
+        for storage, directory in upload_roots():
+            for batch in orphaned_originals(
+                storage, directory, grace, batch_size
+            ):
+                files += len(batch)
+                freed += self.remove(
+                    storage, batch, lambda name: delete_file(name, storage)
+                )
+        for batch in orphaned_sources(batch_size):
+            sources += len(batch)
+            for image_file in batch:
+                self.stdout.write(f'{image_file.name} (записи sorl)')
+                if not self.dry_run:
+                    default.kvstore.delete(image_file)
+        for batch in orphaned_thumbnails(grace, batch_size):
+            files += len(batch)
+            freed += self.remove(
+                default.storage, batch, default.storage.delete
+            )
+        verb = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(
+            f'{verb}: файлов {files} ({freed} байт), '
+            f'записей sorl об отсутствующих файлах {sources}'
+        )
@@ -0,0 +1,57 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.helpers import deserialize
+
+from core.models import ThumbnailTask
+from core.thumbnail import task_source
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = 'Генерирует миниатюры из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ждать новых задач'
+        )
+        parser.add_argument('--sleep', type=float, default=2)
+
+    def process_batch(self, batch_size):
+        tasks = ThumbnailTask.objects.filter(
+            attempts__lt=MAX_ATTEMPTS
+        )[:batch_size]
+        done = 0
+        for task in tasks:
+            try:
+                default.backend.get_thumbnail(
+                    task_source(task), task.geometry,
+                    **deserialize(task.options)
+                )
+            except Exception:
+                logger.exception('Не удалось создать миниатюру %s', task)
+                task.attempts += 1
+                task.save(update_fields=['attempts'])
+            else:
+                task.delete()
+                done += 1
+        return done, len(tasks)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            done, fetched = self.process_batch(options['batch_size'])
+            total += done
+            if fetched:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(f'Создано миниатюр: {total}')
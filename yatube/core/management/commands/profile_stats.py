@@ -0,0 +1,103 @@
+import glob
+import os
+import pstats
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware.profiling import profiling_token
+
+MAX_STACK_DEPTH = 64
+
+
+def frame_label(func):
+    filename, line, name = func
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed_stacks(stats):
+    """Строит свёрнутые стеки для flamegraph.pl по графу вызовов pstats.
+
+    pstats хранит только пары вызывающий-вызываемый, а путей в графе
+    экспоненциально много, поэтому перебирать их нельзя. У каждой
+    функции один стек — через самого тяжёлого вызывающего, он
+    считается один раз. Собственное время функции делится между
+    вызывающими по времени рёбер и дописывается к их стекам.
+    """
+    stacks = {}
+
+    def stack(func, visiting):
+        if func in stacks:
+            return stacks[func]
+        visiting.add(func)
+        callers = stats.stats[func][4]
+        parent = max(
+            (
+                caller for caller in callers
+                if caller in stats.stats and caller not in visiting
+            ),
+            key=lambda caller: callers[caller][3],
+            default=None,
+        )
+        path = (frame_label(func),)
+        if parent is not None:
+            path = stack(parent, visiting)[-MAX_STACK_DEPTH + 1:] + path
+        visiting.discard(func)
+        stacks[func] = path
+        return path
+
+    lines = Counter()
+    for func, (_, _, own_time, _, callers) in stats.stats.items():
+        edges = {
+            caller: edge[2] for caller, edge in callers.items()
+            if caller in stats.stats
+        }
+        edges_time = sum(edges.values())
+        if not edges_time:
+            lines[';'.join(stack(func, set()))] += own_time
+            continue
+        for caller, edge_time in edges.items():
+            path = stack(caller, set())[-MAX_STACK_DEPTH + 1:]
+            path += (frame_label(func),)
+            lines[';'.join(path)] += own_time * edge_time / edges_time
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Объединяет сохранённые профили и выводит самые тяжёлые функции'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'view', nargs='?', default='*',
+            help='Имя view, например posts.index'
+        )
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--sort', default='cumulative')
+        parser.add_argument(
+            '--collapsed', metavar='PATH',
+            help='Записать свёрнутые стеки для flame graph в файл'
+        )
+        parser.add_argument(
+            '--token', action='store_true',
+            help='Вывести значение заголовка X-Profile'
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profiling_token())
+            return
+        files = sorted(glob.glob(os.path.join(
+            settings.PROFILING_DIR, options['view'], '*.pstats'
+        )))
+        if not files:
+            raise CommandError('Профили не найдены')
+        stats = pstats.Stats(*files, stream=self.stdout)
+        if options['collapsed']:
+            with open(options['collapsed'], 'w') as output:
+                for stack, seconds in collapsed_stacks(stats).items():
+                    micros = int(seconds * 1_000_000)
+                    if micros:
+                        output.write(f'{stack} {micros}\n')
+        self.stdout.write(f'Объединено профилей: {len(files)}')
+        stats.sort_stats(options['sort']).print_stats(options['top'])
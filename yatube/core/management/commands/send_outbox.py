@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import OUTBOX_BATCH_SIZE, deliver_batch, delivery_connection
+
+
+class Command(BaseCommand):
+    help = 'Доставляет письма из очереди пачками через одно соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ждать новых писем'
+        )
+        parser.add_argument('--sleep', type=float, default=2)
+
+    def handle(self, *args, **options):
+        connection = delivery_connection()
+        total = 0
+        try:
+            while True:
+                connection.open()
+                sent, fetched = deliver_batch(
+                    connection, options['batch_size']
+                )
+                total += sent
+                if fetched == options['batch_size']:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+        finally:
+            connection.close()
+        self.stdout.write(f'Доставлено писем: {total}')
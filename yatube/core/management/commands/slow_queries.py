@@ -0,0 +1,49 @@
+import glob
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Группирует журнал медленных запросов по нормализованному SQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+
+    def read_records(self):
+        for path in sorted(glob.glob(f'{settings.SLOW_QUERY_LOG}*')):
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for record in self.read_records():
+            groups[record['fingerprint']].append(record)
+        if not groups:
+            raise CommandError('Медленных запросов не найдено')
+        ranked = sorted(
+            groups.items(),
+            key=lambda item: sum(record['duration'] for record in item[1]),
+            reverse=True,
+        )
+        for sql, records in ranked[:options['top']]:
+            durations = [record['duration'] for record in records]
+            slowest = max(records, key=lambda record: record['duration'])
+            self.stdout.write(
+                f'{len(records)} раз, всего {sum(durations):.3f} с, '
+                f'в среднем {sum(durations) / len(durations):.3f} с, '
+                f'максимум {slowest["duration"]:.3f} с'
+            )
+            self.stdout.write(f'  {sql}')
+            for source in ('code', 'template'):
+                if slowest.get(source):
+                    self.stdout.write(f'  {source}: {slowest[source]}')
+            for row in slowest.get('plan') or ():
+                self.stdout.write(f'  plan: {row}')
+            self.stdout.write('')
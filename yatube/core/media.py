@@ -0,0 +1,140 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .storage import is_content_name
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Часть открытого файла: FileResponse читает не больше length
+    байт, начиная с offset."""
+
+    def __init__(self, file_, offset, length):
+        self.file = file_
+        self.remaining = length
+        file_.seek(offset)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(начало, конец) единственного диапазона из заголовка Range.
+
+    None — заголовок не разобран или содержит несколько диапазонов,
+    тогда файл отдаётся целиком; ValueError — диапазон за концом файла.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def cache_control(path):
+    """Файлы по содержимому и миниатюры sorl не меняются под тем же
+    именем, поэтому кешируются навсегда."""
+    if is_content_name(path) or path.startswith(
+        thumbnail_settings.THUMBNAIL_PREFIX
+    ):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+def if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def media_response(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+    last_modified = int(stat.st_mtime)
+    etag = quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+    response = get_conditional_response(request, etag, last_modified)
+    if response is None:
+        response = file_response(
+            request, path, fullpath, stat.st_size, (etag, last_modified)
+        )
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def file_response(request, path, fullpath, size, validators):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    accel_header = settings.MEDIA_ACCEL_HEADER
+    if accel_header:
+        response = HttpResponse(content_type=content_type)
+        if accel_header == 'X-Accel-Redirect':
+            response[accel_header] = settings.MEDIA_ACCEL_PREFIX + path
+        else:
+            response[accel_header] = fullpath
+        return response
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and if_range_passes(request, *validators):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file_ = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file_, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(file_, start, end - start + 1),
+            content_type=content_type,
+            status=206,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
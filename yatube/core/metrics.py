@@ -0,0 +1,264 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .session_backend import KEY_PREFIX as SESSION_KEY_PREFIX
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Накопленные метрики завершившихся процессов
+DEAD_FILENAME = 'metrics-dead.json'
+
+METRICS_HELP = {
+    'yatube_view_latency_seconds': 'Время обработки запроса по имени URL',
+    'yatube_view_queries': 'Число SQL-запросов на запрос по имени URL',
+    'yatube_http_responses_total': 'Ответы по имени URL и классу статуса',
+    'yatube_cache_requests_total': 'Обращения к кешу по префиксу ключа',
+    'yatube_thumbnails_generated_total': 'Сгенерированные миниатюры',
+    'yatube_live_feed_polls_total': 'Опросы новых постов для SSE',
+}
+
+
+# Метки обращений к кешу. Ключи содержат id пользователей, ключи
+# сессий и хеши файлов, поэтому в метку попадает только известный
+# префикс, а всё остальное считается как other
+CACHE_KEY_PREFIXES = frozenset({
+    'auth_user', 'auth_user_version', 'followed_groups', 'following',
+    'lookup_version',
+})
+CACHE_PAGE_KEY = 'views.decorators.cache.'
+CACHE_PAGE_PREFIXES = frozenset({
+    'index_page', 'index_fragment', 'group_fragment', 'profile_fragment',
+})
+THUMBNAIL_KEY_PREFIX = 'sorl-thumbnail'
+
+
+def cache_key_prefix(key):
+    """Метка ключа кеша: key_prefix для cache_page, session, thumbnail
+    или часть ключа до двоеточия, если она из CACHE_KEY_PREFIXES."""
+    key = str(key)
+    if key.startswith(CACHE_PAGE_KEY):
+        prefix = key[len(CACHE_PAGE_KEY):].split('.')[1:2]
+        if prefix and prefix[0] in CACHE_PAGE_PREFIXES:
+            return prefix[0]
+        return 'other'
+    if key.startswith(SESSION_KEY_PREFIX):
+        return 'session'
+    if key.startswith(THUMBNAIL_KEY_PREFIX):
+        return 'thumbnail'
+    prefix = key.split(':', 1)[0]
+    return prefix if prefix in CACHE_KEY_PREFIXES else 'other'
+
+
+class Registry:
+    """Метрики процесса. Периодически сбрасываются в файл
+    METRICS_DIR/metrics-<pid>.json, откуда их суммирует endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += amount
+
+    def observe(self, name, value, buckets, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * (len(buckets) + 1),
+                    'sum': 0.0,
+                }
+            histogram['counts'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), dict(histogram, counts=list(
+                        histogram['counts']
+                    ))]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        now = time.monotonic()
+        if directory is None:
+            return
+        if not force and now - self.last_flush < interval:
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        write_snapshot(
+            os.path.join(directory, f'metrics-{os.getpid()}.json'),
+            self.snapshot()
+        )
+
+
+registry = Registry()
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path, snapshot):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as output:
+        json.dump(snapshot, output)
+    os.replace(tmp_path, path)
+
+
+def merge(snapshot, counters, histograms):
+    for name, labels, value in snapshot['counters']:
+        counters[(name, tuple(sorted(labels.items())))] += value
+    for name, labels, histogram in snapshot['histograms']:
+        key = (name, tuple(sorted(labels.items())))
+        merged = histograms.setdefault(key, {
+            'buckets': histogram['buckets'],
+            'counts': [0] * len(histogram['counts']),
+            'sum': 0.0,
+        })
+        for index, value in enumerate(histogram['counts']):
+            merged['counts'][index] += value
+        merged['sum'] += histogram['sum']
+
+
+@contextmanager
+def locked(directory):
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def prune(directory, filename):
+    """Переносит метрики завершившегося процесса в DEAD_FILENAME,
+    удаляет его файл и сообщает, был ли он удалён. Счётчики процесса
+    не пропадают, поэтому сумма не уменьшается и Prometheus не видит
+    сброса. Процесс, получивший тот же pid, перезапишет файл при
+    первом сбросе."""
+    pid = filename[len('metrics-'):-len('.json')]
+    if not pid.isdigit() or process_exists(int(pid)):
+        return False
+    path = os.path.join(directory, filename)
+    snapshot = read_snapshot(path)
+    if snapshot is not None:
+        dead_path = os.path.join(directory, DEAD_FILENAME)
+        counters, histograms = defaultdict(float), {}
+        for source in (read_snapshot(dead_path), snapshot):
+            if source is not None:
+                merge(source, counters, histograms)
+        write_snapshot(dead_path, {
+            'counters': [
+                [name, dict(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, dict(labels), histogram]
+                for (name, labels), histogram in histograms.items()
+            ],
+        })
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def collect(directory):
+    """Суммирует метрики живых процессов и накопленные метрики
+    завершившихся. Файлы читаются под блокировкой, чтобы перенос
+    в DEAD_FILENAME не попал в сумму дважды или не выпал из неё."""
+    counters = defaultdict(float)
+    histograms = {}
+    with locked(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.json'):
+                prune(directory, filename)
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            snapshot = read_snapshot(os.path.join(directory, filename))
+            if snapshot is not None:
+                merge(snapshot, counters, histograms)
+    return counters, histograms
+
+
+def format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for key, value in items
+    )
+    return '{' + pairs + '}'
+
+
+def render(counters, histograms):
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            lines.append(f'# HELP {name} {METRICS_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name, 'counter')
+        lines.append(f'{name}{format_labels(labels)} {value:g}')
+    for (name, labels), histogram in sorted(histograms.items()):
+        describe(name, 'histogram')
+        cumulative = 0
+        bounds = histogram['buckets'] + ['+Inf']
+        for bound, value in zip(bounds, histogram['counts']):
+            cumulative += value
+            lines.append(
+                f'{name}_bucket{format_labels(labels, le=bound)} '
+                f'{cumulative}'
+            )
+        lines.append(f'{name}_sum{format_labels(labels)} '
+                     f'{histogram["sum"]:g}')
+        lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,67 @@
+import uuid
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache, caches
+from django.utils.functional import SimpleLazyObject
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def user_version_key(user_id):
+    return f'auth_user_version:{user_id}'
+
+
+def user_version(user_id):
+    """Версия пользователя в общем для процессов кеше."""
+    shared = caches['shared']
+    key = user_version_key(user_id)
+    version = shared.get(key)
+    if version is None:
+        shared.add(key, uuid.uuid4().hex, settings.USER_CACHE_TIMEOUT)
+        version = shared.get(key)
+    return version
+
+
+def get_cached_user(request):
+    """Пользователь сессии из локального кеша процесса.
+
+    Закешированный объект принимается, только если его версия
+    совпадает с версией в общем кеше, бэкенд сессии по-прежнему
+    разрешён, пользователь активен, а его хеш для сессии совпадает
+    с хешем в сессии, как в auth.get_user. При сохранении
+    пользователя в любом процессе версия меняется сигналом.
+    """
+    user_id = request.session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+    key = user_cache_key(user_id)
+    version = user_version(user_id)
+    cached = cache.get(key)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    backend = request.session.get(auth.BACKEND_SESSION_KEY)
+    if cached is not None and cached[1] == version and (
+        backend in settings.AUTHENTICATION_BACKENDS
+    ):
+        user = cached[0]
+        if user.is_active and session_hash and (
+            user.get_session_auth_hash() == session_hash
+        ):
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, (user, version), settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+    caches['shared'].delete(user_version_key(instance.pk))
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
@@ -0,0 +1,42 @@
+import time
+
+from ..instrumentation import current_timings
+from ..metrics import LATENCY_BUCKETS, QUERY_BUCKETS, registry
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """Записывает время ответа, число SQL-запросов и статусы
+    по имени URL в реестр метрик процесса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        view = url_name(request)
+        if view == 'metrics':
+            return response
+        registry.observe(
+            'yatube_view_latency_seconds',
+            time.perf_counter() - start, LATENCY_BUCKETS, view=view,
+        )
+        timings = current_timings()
+        if timings is not None:
+            registry.observe(
+                'yatube_view_queries',
+                timings.counts['db'], QUERY_BUCKETS, view=view,
+            )
+        registry.inc(
+            'yatube_http_responses_total',
+            view=view, status=f'{response.status_code // 100}xx',
+        )
+        registry.flush()
+        return response
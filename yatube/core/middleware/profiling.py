@@ -0,0 +1,100 @@
+import cProfile
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core import signing
+
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_SALT = 'core.profiling'
+PROFILING_TOKEN_MAX_AGE = 15 * 60
+PROFILING_MAX_FILES = 100
+
+
+def profiling_token():
+    """Подписанное значение заголовка X-Profile со временем выдачи:
+    оно действует PROFILING_TOKEN_MAX_AGE секунд."""
+    return signing.TimestampSigner(salt=PROFILING_SALT).sign('profile')
+
+
+def has_valid_token(request):
+    token = request.META.get(PROFILING_HEADER)
+    if not token:
+        return False
+    max_age = getattr(
+        settings, 'PROFILING_TOKEN_MAX_AGE', PROFILING_TOKEN_MAX_AGE
+    )
+    try:
+        signing.TimestampSigner(salt=PROFILING_SALT).unsign(
+            token, max_age=max_age
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name.replace(':', '.')
+
+
+class ProfilingMiddleware:
+    """Профилирует cProfile долю запросов PROFILING_SAMPLE_RATE
+    или запросы с подписанным заголовком X-Profile и сохраняет
+    .pstats в PROFILING_DIR/<имя view>/. Для каждого view хранятся
+    только PROFILING_MAX_FILES последних профилей."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.directory = getattr(settings, 'PROFILING_DIR', None)
+        self.max_files = getattr(
+            settings, 'PROFILING_MAX_FILES', PROFILING_MAX_FILES
+        )
+
+    def should_profile(self, request):
+        if self.directory is None:
+            return False
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return has_valid_token(request)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.profiled_response(request)
+        finally:
+            profiler.disable()
+        self.dump(profiler, view_name(request))
+        return response
+
+    def profiled_response(self, request):
+        # Корень графа вызовов: цепочка middleware рекурсивна
+        # и собственного корня в профиле не имеет.
+        return self.get_response(request)
+
+    def dump(self, profiler, name):
+        directory = os.path.join(self.directory, name)
+        os.makedirs(directory, exist_ok=True)
+        filename = f'{time.time_ns()}-{os.getpid()}.pstats'
+        profiler.dump_stats(os.path.join(directory, filename))
+        self.rotate(directory)
+
+    def rotate(self, directory):
+        # Имя начинается со времени в наносекундах, поэтому порядок
+        # имён совпадает с хронологическим
+        names = sorted(
+            name for name in os.listdir(directory)
+            if name.endswith('.pstats')
+        )
+        for name in names[:-self.max_files]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
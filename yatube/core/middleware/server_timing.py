@@ -0,0 +1,60 @@
+from contextlib import ExitStack
+
+from django.db import connections
+
+from ..instrumentation import collect_timings, timed
+
+METRICS = (
+    ('db', 'db', 'queries'),
+    ('template', 'tpl', 'templates'),
+    ('cache', 'cache', None),
+    ('thumbnail', 'thumb', 'thumbnails'),
+)
+
+
+def timed_execute(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def format_metric(name, seconds, description=None):
+    metric = f'{name};dur={seconds * 1000:.1f}'
+    if description:
+        metric += f';desc="{description}"'
+    return metric
+
+
+def server_timing(timings):
+    metrics = []
+    for key, name, unit in METRICS:
+        if key not in timings.counts:
+            continue
+        if unit is None:
+            hits = timings.counts['cache_hits']
+            lookups = hits + timings.counts['cache_misses']
+            description = f'hit {hits}/{lookups}'
+        else:
+            description = f'{timings.counts[key]} {unit}'
+        metrics.append(
+            format_metric(name, timings.durations[key], description)
+        )
+    metrics.append(format_metric('total', timings.total()))
+    return ', '.join(metrics)
+
+
+class ServerTimingMiddleware:
+    """Добавляет к ответу заголовок Server-Timing с разбивкой времени
+    на SQL, шаблоны, кеш и миниатюры."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_timings() as timings, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timed_execute)
+                )
+            response = self.get_response(request)
+            response['Server-Timing'] = server_timing(timings)
+        return response
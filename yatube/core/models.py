@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ThumbnailTask(models.Model):
+    """Миниатюра, которую нужно сгенерировать вне запроса."""
+    key = models.CharField(max_length=32, unique=True)
+    source = models.CharField(max_length=255)
+    storage = models.CharField(max_length=255, blank=True)
+    geometry = models.CharField(max_length=50)
+    options = models.TextField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('pk',)
+
+    def __str__(self):
+        return f'{self.source} {self.geometry}'
+
+
+class StoredFile(models.Model):
+    """Файл хранилища по содержимому и число записей, которые
+    на него ссылаются."""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class OutboxMessage(models.Model):
+    """Письмо, которое ещё нужно доставить командой send_outbox."""
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField()
+    message = models.BinaryField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('pk',)
+
+    def __str__(self):
+        return f'{self.from_email} -> {self.recipients}'
@@ -0,0 +1,180 @@
+import heapq
+import posixpath
+from datetime import timedelta
+from itertools import islice
+
+from django.apps import apps
+from django.db.models import FileField
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import StoredFile
+from .thumbnail import get_raw_many
+
+BATCH_SIZE = 500
+GRACE_PERIOD = timedelta(hours=24)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def walk(storage, directory):
+    """Имена файлов каталога хранилища по возрастанию, рекурсивно.
+
+    В памяти только листинг одного каталога. Подкаталог сортируется как
+    «имя/», поэтому порядок совпадает с побайтовым порядком полных имён.
+    """
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    entries = [(name + '/', True) for name in directories]
+    entries += [(name, False) for name in files]
+    for name, is_directory in sorted(entries):
+        path = posixpath.join(directory, name)
+        if is_directory:
+            yield from walk(storage, path)
+        else:
+            yield path
+
+
+def unreferenced(names, references):
+    """Имена, которых нет среди references: слияние двух
+    отсортированных потоков без множества в памяти."""
+    references = iter(references)
+    current = next(references, None)
+    for name in names:
+        while current is not None and current < name:
+            current = next(references, None)
+        if current != name:
+            yield name
+
+
+def upload_roots():
+    """(хранилище, каталог) для каждого файлового поля моделей:
+    каталог — постоянная часть upload_to до первого шаблона даты."""
+    roots = {}
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, FileField) or callable(field.upload_to):
+                continue
+            directory = field.upload_to.split('%', 1)[0].rstrip('/')
+            if not directory:
+                continue
+            key = (repr(field.storage.deconstruct()), directory)
+            roots.setdefault(key, (field.storage, directory))
+    return list(roots.values())
+
+
+def file_fields(storage):
+    """(модель, имя поля) всех файловых полей с этим хранилищем."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and (
+                field.storage.deconstruct() == storage.deconstruct()
+            ):
+                yield model, field.name
+
+
+def reference_streams(storage, directory):
+    """Отсортированные имена файлов из базы: поля моделей
+    и счётчики ссылок StoredFile."""
+    prefix = directory.rstrip('/') + '/'
+    querysets = [
+        model._default_manager.filter(
+            **{f'{name}__startswith': prefix}
+        ).order_by(name).values_list(name, flat=True).distinct()
+        for model, name in file_fields(storage)
+    ]
+    querysets.append(StoredFile.objects.filter(
+        name__startswith=prefix
+    ).order_by('name').values_list('name', flat=True))
+    return [queryset.iterator() for queryset in querysets]
+
+
+def still_referenced(storage, names):
+    """Повторная точная проверка кандидатов запросами по IN: защищает
+    от файлов, сохранённых во время обхода, и от различий в сортировке
+    строк базой."""
+    found = set(StoredFile.objects.filter(
+        name__in=names
+    ).values_list('name', flat=True))
+    for model, name in file_fields(storage):
+        found.update(model._default_manager.filter(
+            **{f'{name}__in': names}
+        ).values_list(name, flat=True))
+    return found
+
+
+def is_old(storage, name, cutoff):
+    try:
+        return storage.get_modified_time(name) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def orphaned_originals(storage, directory, grace=GRACE_PERIOD,
+                       batch_size=BATCH_SIZE):
+    """Пачки имён файлов directory, на которые никто не ссылается
+    и которые не менялись дольше grace."""
+    cutoff = timezone.now() - grace
+    candidates = unreferenced(
+        walk(storage, directory),
+        heapq.merge(*reference_streams(storage, directory)),
+    )
+    for batch in batches(candidates, batch_size):
+        referenced = still_referenced(storage, batch)
+        orphans = [
+            name for name in batch
+            if name not in referenced and is_old(storage, name, cutoff)
+        ]
+        if orphans:
+            yield orphans
+
+
+def orphaned_sources(batch_size=BATCH_SIZE):
+    """Пачки записей key-value хранилища sorl об исходных файлах,
+    которых больше нет в хранилище."""
+    prefix = add_prefix('', 'image')
+    thumbnail_prefix = thumbnail_settings.THUMBNAIL_PREFIX
+    values = KVStoreModel.objects.filter(
+        key__startswith=prefix
+    ).order_by('key').values_list('value', flat=True).iterator()
+    for batch in batches(values, batch_size):
+        orphans = []
+        for value in batch:
+            image_file = deserialize_image_file(value)
+            if image_file.name.startswith(thumbnail_prefix):
+                continue
+            if not image_file.exists():
+                orphans.append(image_file)
+        if orphans:
+            yield orphans
+
+
+def orphaned_thumbnails(grace=GRACE_PERIOD, batch_size=BATCH_SIZE):
+    """Пачки файлов миниатюр без записи в key-value хранилище: sorl
+    их уже не найдёт и не удалит."""
+    storage = default.storage
+    cutoff = timezone.now() - grace
+    names = walk(storage, thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/'))
+    for batch in batches(names, batch_size):
+        keys = {
+            add_prefix(ImageFile(name, storage).key): name for name in batch
+        }
+        known = get_raw_many(list(keys))
+        orphans = [
+            name for key, name in keys.items()
+            if key not in known and is_old(storage, name, cutoff)
+        ]
+        if orphans:
+            yield orphans
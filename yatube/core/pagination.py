@@ -0,0 +1,179 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MERGE_CHUNK = 4
+
+
+def encode_cursor(values):
+    # DjangoJSONEncoder округляет время до миллисекунд, а курсору
+    # нужно точное значение
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ValidationError('Некорректный курсор')
+
+
+class CursorPaginator:
+    """Пагинация по курсору: следующая страница начинается сразу
+    после последней записи предыдущей, без OFFSET и COUNT(*).
+
+    Выборка упорядочивается по field, а при равенстве — по pk,
+    поэтому курсор однозначен.
+    """
+
+    def __init__(self, field='pk', descending=True, parse=None):
+        self.field = field
+        self.descending = descending
+        self.parse = parse
+
+    def ordering(self):
+        sign = '-' if self.descending else ''
+        if self.field == 'pk':
+            return (f'{sign}pk',)
+        return (f'{sign}{self.field}', f'{sign}pk')
+
+    def cursor_key(self, cursor):
+        """Ключ сортировки из курсора. Курсор приходит от клиента,
+        поэтому проверяется форма значения, а не только base64 и JSON."""
+        values = decode_cursor(cursor)
+        size = 1 if self.field == 'pk' else 2
+        if not isinstance(values, list) or len(values) != size:
+            raise ValidationError('Некорректный курсор')
+        *fields, pk = values
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            raise ValidationError('Некорректный курсор')
+        if fields:
+            return [self.parse_value(fields[0]), pk]
+        return [pk]
+
+    def parse_value(self, value):
+        if self.parse is None:
+            if not isinstance(value, (int, float, str)):
+                raise ValidationError('Некорректный курсор')
+            return value
+        if not isinstance(value, str):
+            raise ValidationError('Некорректный курсор')
+        try:
+            value = self.parse(value)
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError('Некорректный курсор')
+        return value
+
+    def after(self, queryset, cursor):
+        return self.after_key(queryset, self.cursor_key(cursor))
+
+    def after_key(self, queryset, key):
+        lookup = 'lt' if self.descending else 'gt'
+        if self.field == 'pk':
+            return queryset.filter(**{f'pk__{lookup}': key[0]})
+        return queryset.filter(
+            Q(**{f'{self.field}__{lookup}': key[0]})
+            | Q(**{self.field: key[0], f'pk__{lookup}': key[1]})
+        )
+
+    def key(self, item):
+        if self.field == 'pk':
+            return (item.pk,)
+        return (getattr(item, self.field), item.pk)
+
+    def cursor_for(self, item):
+        return encode_cursor(list(self.key(item)))
+
+    def limit(self, request):
+        try:
+            limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError('limit должен быть числом')
+        if limit < 1:
+            raise ValidationError('limit должен быть больше нуля')
+        return min(limit, MAX_LIMIT)
+
+    def paginate(self, queryset, request):
+        """Возвращает (объекты страницы, курсор следующей страницы)."""
+        return self.paginate_chain([queryset], request)
+
+    def paginate_chain(self, querysets, request, limit=None):
+        """Страница из нескольких выборок с одинаковым порядком,
+        например постов и архива: из каждой берётся не больше limit + 1
+        записей, и они сливаются по ключу сортировки."""
+        if limit is None:
+            limit = self.limit(request)
+        cursor = request.GET.get('cursor')
+        pages = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*self.ordering())
+            if cursor:
+                queryset = self.after(queryset, cursor)
+            pages.append(list(queryset[:limit + 1]))
+        if len(pages) == 1:
+            items = pages[0]
+        else:
+            items = list(heapq.merge(
+                *pages, key=self.key, reverse=self.descending
+            ))[:limit + 1]
+        if len(items) <= limit:
+            return items, None
+        return items[:limit], self.cursor_for(items[limit - 1])
+
+    def keys(self, queryset, key=None, chunk=MERGE_CHUNK):
+        """Ключи сортировки выборки по порядку. Читаются порциями
+        от ключа key: первая порция — chunk строк, каждая следующая
+        вдвое больше."""
+        fields = ('pk',) if self.field == 'pk' else (self.field, 'pk')
+        queryset = queryset.order_by(*self.ordering()).values_list(*fields)
+        while True:
+            rows = list((
+                queryset if key is None else self.after_key(queryset, key)
+            )[:chunk])
+            yield from rows
+            if len(rows) < chunk:
+                return
+            key = rows[-1]
+            chunk *= 2
+
+    def merge(self, querysets, request, limit=None, chunk=MERGE_CHUNK):
+        """Страница из многих выборок одной модели, которые могут
+        пересекаться, например постов разных подписок.
+
+        Выборки сливаются кучей лениво: каждая отдаёт ключи порциями
+        по курсору, поэтому для первой страницы из большинства читается
+        несколько строк, а не всё, как в одном запросе с OR. Одна и та
+        же запись из разных выборок имеет одинаковый ключ и при слиянии
+        идёт подряд, так что повторы отбрасываются сравнением с
+        предыдущей. Возвращает (pk страницы по порядку, курсор).
+        """
+        if limit is None:
+            limit = self.limit(request)
+        cursor = request.GET.get('cursor')
+        key = self.cursor_key(cursor) if cursor else None
+        streams = [self.keys(queryset, key, chunk) for queryset in querysets]
+        keys = []
+        for item in heapq.merge(*streams, reverse=self.descending):
+            if keys and keys[-1] == item:
+                continue
+            keys.append(item)
+            if len(keys) > limit:
+                break
+        pks = [item[-1] for item in keys[:limit]]
+        if len(keys) <= limit:
+            return pks, None
+        return pks, encode_cursor(list(keys[limit - 1]))
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import (
+    SessionStore as CachedDBStore
+)
+from django.utils import timezone
+
+KEY_PREFIX = 'core.session'
+
+
+class SessionStore(CachedDBStore):
+    """Сессии в общем кеше с записью в базу только при необходимости.
+
+    В кеше вместе с данными лежит срок жизни сессии. save() ничего
+    не пишет, если данные не изменились по сути, а до истечения срока
+    осталось больше SESSION_REFRESH_WINDOW секунд; иначе срок
+    продлевается одной записью в базу и кеш.
+    """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._saved_state = None
+
+    def load(self):
+        try:
+            cached = self._cache.get(self.cache_key)
+        except Exception:
+            cached = None
+        if cached is None:
+            session = self._get_session_from_db()
+            if session is None:
+                return {}
+            data = self.decode(session.session_data)
+            cached = (data, session.expire_date)
+            self._cache.set(
+                self.cache_key, cached,
+                self.get_expiry_age(expiry=session.expire_date),
+            )
+        data, expire_date = cached
+        self._saved_state = self.serializer().dumps(data)
+        refresh_window = timedelta(seconds=settings.SESSION_REFRESH_WINDOW)
+        if expire_date - timezone.now() < refresh_window:
+            self.modified = True
+            self._saved_state = None
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        state = self.serializer().dumps(data)
+        if not must_create and state == self._saved_state:
+            return
+        super(CachedDBStore, self).save(must_create)
+        self._cache.set(
+            self.cache_key,
+            (data, self.get_expiry_date()),
+            self.get_expiry_age(),
+        )
+        self._saved_state = state
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+TEMPLATE_MODULE = os.path.join('django', 'template', 'base.py')
+
+_loggers = {}
+
+
+def get_logger(path):
+    logger = _loggers.get(path)
+    if logger is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        logger = logging.getLogger(f'yatube.slow_queries.{len(_loggers)}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(RotatingFileHandler(
+            path,
+            maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding='utf-8',
+        ))
+        _loggers[path] = logger
+    return logger
+
+
+def fingerprint(sql):
+    """Нормализованный SQL: литералы и списки IN заменены на ?."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'%s', '?', sql)
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(...)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def find_caller():
+    """Ближайший к запросу шаблон и строка кода проекта."""
+    template = None
+    code = None
+    frame = sys._getframe(2)
+    while frame is not None and (template is None or code is None):
+        filename = frame.f_code.co_filename
+        node = frame.f_locals.get('self')
+        if (
+            template is None
+            and filename.endswith(TEMPLATE_MODULE)
+            and getattr(node, 'token', None) is not None
+            and getattr(node, 'origin', None) is not None
+        ):
+            template = f'{node.origin.template_name}:{node.token.lineno}'
+        if (
+            code is None
+            and filename.startswith(settings.BASE_DIR)
+            and 'site-packages' not in filename
+            and not filename.startswith(os.path.dirname(__file__))
+        ):
+            relative = os.path.relpath(filename, settings.BASE_DIR)
+            code = f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return code, template
+
+
+def describe_param(param):
+    """Тип параметра и длина строки вместо значения: в параметрах
+    бывают хеши паролей и данные сессий."""
+    name = type(param).__name__
+    if isinstance(param, (str, bytes, memoryview)):
+        return f'{name}({len(param)})'
+    return name
+
+
+def explain(connection, sql, params):
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    # Курсор бэкенда без execute_wrappers: сам EXPLAIN не журналируется,
+    # а плейсхолдеры %s приводятся к формату драйвера, например к ? в SQLite
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params or ())
+        return [' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'EXPLAIN не выполнен: {error}']
+    finally:
+        cursor.close()
+
+
+def log_slow_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD', None)
+        if threshold is not None and duration >= threshold:
+            record_slow_query(context['connection'], sql, params, many,
+                              duration)
+
+
+def record_slow_query(connection, sql, params, many, duration):
+    code, template = find_caller()
+    record = {
+        'time': time.time(),
+        'duration': duration,
+        'sql': sql,
+        'params': None if many else [
+            describe_param(param) for param in params or ()
+        ],
+        'fingerprint': fingerprint(sql),
+        'code': code,
+        'template': template,
+        'plan': None if many else explain(connection, sql, params),
+    }
+    get_logger(settings.SLOW_QUERY_LOG).info(
+        json.dumps(record, ensure_ascii=False)
+    )
+
+
+def install_slow_query_logger(sender, connection, **kwargs):
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
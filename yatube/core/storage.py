@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import StoredFile
+
+HASH_CHUNK_SIZE = 64 * 1024
+CONTENT_NAME = re.compile(r'(?:.+/)?([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, где имя файла — sha256 его содержимого.
+
+    Одинаковые картинки сохраняются один раз: повторная загрузка
+    возвращает имя уже существующего файла, а миниатюры sorl, ключ
+    которых строится по имени, становятся общими.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, hexdigest[:2], f'{hexdigest}{extension}'
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def is_content_name(name):
+    """Имя выдано хранилищем по содержимому; файлы со старыми именами
+    не разделяются между записями и ссылки на них не считаются."""
+    return bool(name) and CONTENT_NAME.fullmatch(name) is not None
+
+
+def retain(name):
+    """Увеличивает число записей, ссылающихся на файл."""
+    if not is_content_name(name):
+        return
+    with transaction.atomic():
+        stored, created = StoredFile.objects.select_for_update(
+        ).get_or_create(name=name, defaults={'references': 1})
+        if not created:
+            stored.references = F('references') + 1
+            stored.save(update_fields=['references'])
+
+
+def release(name, storage=content_storage):
+    """Уменьшает число ссылок; последняя ссылка удаляет файл
+    и его миниатюры после фиксации транзакции."""
+    if not is_content_name(name):
+        return
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if stored is None:
+            return
+        if stored.references > 1:
+            stored.references = F('references') - 1
+            stored.save(update_fields=['references'])
+            return
+        stored.delete()
+    transaction.on_commit(lambda: delete_file(name, storage))
+
+
+def delete_file(name, storage=content_storage):
+    if StoredFile.objects.filter(name=name).exists():
+        return
+    image_file = ImageFile(name, storage)
+    default.kvstore.delete_thumbnails(image_file)
+    default.kvstore.delete(image_file)
+    storage.delete(name)
@@ -1,10 +1,878 @@
-from django.test import TestCase
+import glob
+import json
+import multiprocessing
+import os
+import pstats
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
 from http import HTTPStatus
 
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from posts.archive import archive_chunk
+from posts.models import ArchivedPost, Post, User
+
+from .backup import MAX_RESTARTS, BackupError, copy_pages, rotate
+from .management.commands.profile_stats import collapsed_stacks
+from .metrics import cache_key_prefix
+from .middleware.auth import invalidate_cached_user
+from .middleware.profiling import profiling_token
+from .session_backend import KEY_PREFIX as SESSION_KEY_PREFIX
+from .session_backend import SessionStore
+from .models import OutboxMessage, StoredFile, ThumbnailTask
+from .orphans import orphaned_originals
+from .slow_queries import fingerprint
+from .storage import content_storage
+from .thumbnail import resolve_thumbnails
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('Почтовый сервер недоступен')
+
 
 class ViewTestClass(TestCase):
     def test_error_page(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+    def test_server_timing_header(self):
+        """Ответ содержит разбивку времени по SQL, шаблонам и кешу."""
+        cache.clear()
+        response = self.client.get('/')
+        metrics = {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+        self.assertEqual(
+            set(metrics), {'db', 'tpl', 'cache', 'total'}
+        )
+        self.assertIn('desc="1 templates"', metrics['tpl'])
+        self.assertIn('desc="hit 0/', metrics['cache'])
+        response = self.client.get('/')
+        self.assertNotIn('tpl', response['Server-Timing'])
+        self.assertIn('desc="hit 2/2"', response['Server-Timing'])
+
+
+@override_settings(PROFILING_DIR=TEMP_DIR)
+class ProfilingTestClass(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def profiles(self, view='*'):
+        return glob.glob(
+            os.path.join(TEMP_DIR, view, '*.pstats')
+        )
+
+    def setUp(self):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_unsampled_request_is_not_profiled(self):
+        """Без выборки и заголовка профиль не сохраняется."""
+        self.client.get('/about/author/', HTTP_X_PROFILE='forged')
+        self.assertEqual(self.profiles(), [])
+
+    def test_signed_header_profiles_request(self):
+        """Запрос с подписанным заголовком профилируется по имени view."""
+        self.client.get('/about/author/', HTTP_X_PROFILE=profiling_token())
+        self.assertEqual(len(self.profiles('about.author')), 1)
+
+    @override_settings(PROFILING_TOKEN_MAX_AGE=60)
+    def test_expired_token_is_rejected(self):
+        """Заголовок X-Profile действует ограниченное время."""
+        token = profiling_token()
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.client.get('/about/author/', HTTP_X_PROFILE=token)
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MAX_FILES=2)
+    def test_profiles_are_rotated(self):
+        """Для view хранятся только PROFILING_MAX_FILES последних
+        профилей."""
+        for _ in range(4):
+            self.client.get('/about/author/')
+        self.assertEqual(len(self.profiles('about.author')), 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_profile_stats_command(self):
+        """Команда объединяет профили и пишет свёрнутые стеки."""
+        self.client.get('/about/author/')
+        self.client.get('/about/author/')
+        collapsed = os.path.join(TEMP_DIR, 'stacks.txt')
+        out = StringIO()
+        call_command(
+            'profile_stats', 'about.author', top=5,
+            collapsed=collapsed, stdout=out
+        )
+        self.assertIn('Объединено профилей: 2', out.getvalue())
+        with open(collapsed) as stacks:
+            self.assertIn('get_response', stacks.read())
+
+    def test_collapsed_stacks_of_post_detail(self):
+        """Свёрнутые стеки реального запроса строятся быстро и
+        сохраняют всё собственное время функций."""
+        user = User.objects.create_user(username='profiled')
+        post = Post.objects.create(text='Пост', author=user)
+        for i in range(5):
+            post.comments.create(author=user, text=f'Комментарий {i}')
+        self.client.force_login(user)
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            HTTP_X_PROFILE=profiling_token(),
+        )
+        stats = pstats.Stats(*self.profiles('posts.post_detail'))
+        self.assertGreater(len(stats.stats), 500)
+        started = time.monotonic()
+        lines = collapsed_stacks(stats)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertAlmostEqual(
+            sum(lines.values()), stats.total_tt, places=6
+        )
+        self.assertTrue(any(
+            'post_detail' in stack.split(';')[-1] for stack in lines
+        ))
+
+
+@override_settings(METRICS_DIR=TEMP_DIR)
+class MetricsTestClass(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_metrics_endpoint(self):
+        """Endpoint отдаёт гистограммы по имени URL
+        и обращения к кешу по префиксу ключа."""
+        cache.clear()
+        self.client.get('/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content = response.content.decode()
+        self.assertIn(
+            'yatube_view_latency_seconds_count{view="posts:index"}', content
+        )
+        self.assertIn(
+            'yatube_view_queries_bucket{view="posts:index",le="+Inf"}',
+            content
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{prefix="index_page",result="miss"}',
+            content
+        )
+        self.assertNotIn('view="metrics"', content)
+
+    def test_metrics_are_merged_across_processes(self):
+        """Метрики из файлов других процессов суммируются."""
+        snapshot = {
+            'counters': [[
+                'yatube_http_responses_total',
+                {'status': '5xx', 'view': 'posts:other'},
+                3,
+            ]],
+            'histograms': [],
+        }
+        os.makedirs(TEMP_DIR, exist_ok=True)
+        path = os.path.join(TEMP_DIR, f'metrics-{os.getppid()}.json')
+        with open(path, 'w') as output:
+            json.dump(snapshot, output)
+        response = self.client.get('/metrics/')
+        self.assertIn(
+            'yatube_http_responses_total{status="5xx",view="posts:other"} 3',
+            response.content.decode()
+        )
+
+    def test_files_of_dead_processes_are_merged(self):
+        """Файл метрик завершившегося процесса удаляется, а его
+        счётчики остаются в сумме: Prometheus не видит сброса."""
+        process = subprocess.Popen(['true'])
+        process.wait()
+        os.makedirs(TEMP_DIR, exist_ok=True)
+        path = os.path.join(TEMP_DIR, f'metrics-{process.pid}.json')
+        with open(path, 'w') as output:
+            json.dump({'counters': [[
+                'yatube_http_responses_total',
+                {'status': '2xx', 'view': 'posts:dead'},
+                1,
+            ]], 'histograms': []}, output)
+        dead = (
+            'yatube_http_responses_total'
+            '{status="2xx",view="posts:dead"} 1\n'
+        )
+        response = self.client.get('/metrics/')
+        self.assertIn(dead, response.content.decode())
+        self.assertFalse(os.path.exists(path))
+        response = self.client.get('/metrics/')
+        self.assertIn(dead, response.content.decode())
+
+    def test_cache_labels_do_not_expose_keys(self):
+        """Ключи сессий, миниатюр и прочие ключи кеша не становятся
+        метками: метка берётся из фиксированного набора."""
+        labels = {
+            f'{SESSION_KEY_PREFIX}abcdef0123456789': 'session',
+            'sorl-thumbnail||image||0123456789abcdef': 'thumbnail',
+            'following:42': 'following',
+            'views.decorators.cache.cache_page.index_page.GET.1.2':
+                'index_page',
+            'views.decorators.cache.cache_page..GET.1.2': 'other',
+            'unknown-key-42': 'other',
+            'unknown:42': 'other',
+        }
+        for key, label in labels.items():
+            with self.subTest(key=key):
+                self.assertEqual(cache_key_prefix(key), label)
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='reader'))
+        self.client.get('/')
+        content = self.client.get('/metrics/').content.decode()
+        self.assertIn('prefix="session"', content)
+        self.assertNotIn(self.client.session.session_key, content)
+
+    def test_metrics_forbidden_for_other_hosts(self):
+        """Метрики недоступны с посторонних адресов."""
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+@override_settings(
+    SLOW_QUERY_THRESHOLD=0,
+    SLOW_QUERY_LOG=os.path.join(TEMP_DIR, 'slow.log'),
+)
+class SlowQueryTestClass(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.create(
+            text='Текст',
+            author=User.objects.create_user(username='testuser')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_slow_queries_are_logged_with_plan(self):
+        """Медленный запрос попадает в журнал с планом и местом вызова."""
+        cache.clear()
+        self.client.get('/')
+        with open(settings.SLOW_QUERY_LOG, encoding='utf-8') as log:
+            records = [json.loads(line) for line in log]
+        select = next(
+            record for record in records
+            if record['sql'].startswith('SELECT "posts_post"."id"')
+        )
+        self.assertTrue(select['code'])
+        self.assertIn('posts/index.html', select['template'])
+        out = StringIO()
+        call_command('slow_queries', top=3, stdout=out)
+        self.assertIn('plan:', out.getvalue())
+        self.assertNotIn('EXPLAIN не выполнен', out.getvalue())
+
+    def test_parameterized_query_plan(self):
+        """План строится и для запроса с параметрами, а значения
+        параметров в журнал не попадают."""
+        list(User.objects.filter(password='секретный хеш'))
+        with open(settings.SLOW_QUERY_LOG, encoding='utf-8') as log:
+            records = [json.loads(line) for line in log]
+        record = next(
+            record for record in reversed(records)
+            if record['sql'].startswith('SELECT')
+            and 'WHERE "auth_user"."password" = %s' in record['sql']
+        )
+        self.assertEqual(record['params'], ['str(13)'])
+        self.assertNotIn('секретный', json.dumps(record, ensure_ascii=False))
+        plan = ' '.join(record['plan'])
+        self.assertIn('auth_user', plan)
+        self.assertNotIn('EXPLAIN не выполнен', plan)
+
+    def test_fingerprint(self):
+        """Литералы и списки IN нормализуются."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a IN (1, 2, 3) AND b = 'x'"),
+            'SELECT * FROM t WHERE a IN (...) AND b = ?'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR)
+class ThumbnailQueueTestClass(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='Текст',
+            author=User.objects.create_user(username='testuser'),
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_missing_thumbnails_are_queued(self):
+        """Недостающая миниатюра ставится в очередь, а после генерации
+        карточка получает её адрес."""
+        cache.clear()
+        response = self.client.get('/')
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertEqual(ThumbnailTask.objects.count(), 1)
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertFalse(ThumbnailTask.objects.exists())
+        cache.clear()
+        response = self.client.get('/')
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+        self.assertContains(response, 'src="/media/cache/')
+
+    def test_feed_reports_thumbnail_timing(self):
+        """Миниатюры ленты попадают в Server-Timing с числом файлов."""
+        cache.clear()
+        response = self.client.get('/')
+        metrics = {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+        self.assertIn('desc="1 thumbnails"', metrics['thumb'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR)
+class ContentStorageTestClass(TransactionTestCase):
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser')
+        self.posts = [
+            Post.objects.create(
+                text=f'Репост {index}',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    f'meme{index}.gif', self.small_gif, 'image/gif'
+                ),
+            )
+            for index in range(3)
+        ]
+        self.name = self.posts[0].image.name
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_identical_images_are_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с общим счётчиком."""
+        self.assertEqual({post.image.name for post in self.posts}, {
+            self.name
+        })
+        self.assertEqual(
+            len(glob.glob(os.path.join(TEMP_DIR, 'posts', '*', '*'))), 1
+        )
+        self.assertEqual(StoredFile.objects.get(name=self.name).references, 3)
+
+    def test_thumbnail_is_shared(self):
+        """Для одинаковых картинок ставится одна задача на миниатюру."""
+        resolve_thumbnails([post.image for post in self.posts], '100x100')
+        self.assertEqual(ThumbnailTask.objects.count(), 1)
+
+    def test_file_is_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последним постом."""
+        self.posts[0].delete()
+        self.posts[1].delete()
+        self.assertTrue(content_storage.exists(self.name))
+        self.posts[2].delete()
+        self.assertFalse(content_storage.exists(self.name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_archived_post_keeps_reference(self):
+        """Перенос поста в архив не освобождает его картинку."""
+        for post in self.posts[1:]:
+            post.delete()
+        archive_chunk(timezone.now() + timedelta(days=1))
+        self.assertTrue(ArchivedPost.objects.filter(image=self.name).exists())
+        self.assertTrue(content_storage.exists(self.name))
+        self.assertEqual(StoredFile.objects.get(name=self.name).references, 1)
+
+    def test_dedupe_command_moves_legacy_images(self):
+        """Картинки со старыми именами переносятся в общий файл."""
+        legacy = os.path.join(TEMP_DIR, 'posts', 'legacy.gif')
+        with open(legacy, 'wb') as legacy_file:
+            legacy_file.write(self.small_gif)
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            image='posts/legacy.gif'
+        )
+        call_command('dedupe_images', stdout=StringIO())
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).image.name, self.name
+        )
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(StoredFile.objects.get(name=self.name).references, 3)
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR)
+class MediaCollectorTestClass(TestCase):
+    small_gif = ContentStorageTestClass.small_gif
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст',
+            author=User.objects.create_user(username='testuser'),
+            image=SimpleUploadedFile('small.gif', self.small_gif),
+        )
+        get_thumbnail(self.post.image, '100x100')
+        self.orphan = self.save_file(b'\x10' * 3, age=timedelta(days=2))
+        self.orphan_thumbnail = get_thumbnail(
+            content_storage.open(self.orphan), '100x100'
+        ).name
+        self.fresh = self.save_file(b'\x20' * 3)
+        self.lost = self.save_file(b'\x30' * 3)
+        self.lost_thumbnail = get_thumbnail(
+            content_storage.open(self.lost), '50x50'
+        ).name
+        content_storage.delete(self.lost)
+        self.stray_thumbnail = default_storage.save(
+            'cache/00/00/stray.gif', ContentFile(self.small_gif)
+        )
+        self.age(default_storage.path(self.stray_thumbnail), timedelta(days=2))
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def age(self, path, age):
+        timestamp = (timezone.now() - age).timestamp()
+        os.utime(path, (timestamp, timestamp))
+
+    def save_file(self, palette, age=None):
+        content = self.small_gif[:13] + palette + self.small_gif[16:]
+        name = content_storage.save('posts/orphan.gif', ContentFile(content))
+        if age is not None:
+            self.age(content_storage.path(name), age)
+        return name
+
+    def collect(self, *args):
+        output = StringIO()
+        call_command('collect_media', *args, batch_size=2, stdout=output)
+        return output.getvalue()
+
+    def test_dry_run_keeps_files(self):
+        """Пробный запуск только перечисляет найденное."""
+        output = self.collect('--dry-run')
+        self.assertIn(self.orphan, output)
+        self.assertIn(self.stray_thumbnail, output)
+        self.assertNotIn(self.post.image.name, output)
+        self.assertTrue(content_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.stray_thumbnail))
+
+    def test_orphans_are_deleted(self):
+        """Удаляются старые файлы без ссылок, их миниатюры и записи sorl;
+        используемые и свежие файлы остаются."""
+        self.collect()
+        self.assertFalse(content_storage.exists(self.orphan))
+        self.assertFalse(default_storage.exists(self.orphan_thumbnail))
+        self.assertFalse(default_storage.exists(self.lost_thumbnail))
+        self.assertFalse(default_storage.exists(self.stray_thumbnail))
+        self.assertIsNone(
+            default.kvstore.get(ImageFile(self.lost, content_storage))
+        )
+        self.assertTrue(content_storage.exists(self.post.image.name))
+        self.assertTrue(content_storage.exists(self.fresh))
+        self.assertTrue(default_storage.exists(
+            get_thumbnail(self.post.image, '100x100').name
+        ))
+        self.assertNotIn(self.post.image.name, self.collect('--dry-run'))
+
+    def test_new_reference_is_not_deleted(self):
+        """Файл, на который ссылка появилась после обхода, остаётся."""
+        batches = orphaned_originals(
+            content_storage, 'posts', timedelta(0), batch_size=10
+        )
+        Post.objects.filter(pk=self.post.pk).update(image=self.orphan)
+        orphans = [name for batch in batches for name in batch]
+        self.assertNotIn(self.orphan, orphans)
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR, MEDIA_ACCEL_HEADER='')
+class MediaServingTestClass(TestCase):
+    content = b'0123456789'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        digest = 'ab' + '0' * 62
+        cls.content_name = f'posts/ab/{digest}.txt'
+        for name in (cls.content_name, 'plain.txt'):
+            path = os.path.join(TEMP_DIR, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as media_file:
+                media_file.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def get(self, name, **headers):
+        return self.client.get(settings.MEDIA_URL + name, **headers)
+
+    def test_file_is_streamed_with_validators(self):
+        """Файл отдаётся потоком с ETag и кешированием по имени."""
+        response = self.get(self.content_name)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertIn('ETag', response)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertNotIn('immutable', self.get('plain.txt')['Cache-Control'])
+
+    def test_conditional_requests(self):
+        """Совпавший ETag или дата изменения дают 304."""
+        response = self.get('plain.txt')
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                response = self.get('plain.txt', **headers)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_range_requests(self):
+        """Range отдаёт часть файла, недостижимый диапазон — 416."""
+        cases = {
+            'bytes=2-5': b'2345',
+            'bytes=7-': b'789',
+            'bytes=-3': b'789',
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                response = self.get('plain.txt', HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content), expected
+                )
+        response = self.get('plain.txt', HTTP_RANGE='bytes=20-')
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response = self.get(
+            'plain.txt', HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_path_outside_media_root(self):
+        """Выход за MEDIA_ROOT даёт 404."""
+        response = self.get('../settings.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        """В режиме X-Accel-Redirect файл отдаёт веб-сервер."""
+        response = self.get('plain.txt')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/plain.txt'
+        )
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+    EMAIL_FILE_PATH=TEMP_DIR,
+)
+class OutboxTestClass(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='reader', email='reader@yatube.ru', password='secret'
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def request_reset(self):
+        return self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@yatube.ru'},
+        )
+
+    def test_reset_email_is_queued_and_delivered(self):
+        """Письмо сброса пароля ставится в очередь и доставляется
+        командой в файловый бэкенд."""
+        self.request_reset()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertFalse(glob.glob(os.path.join(TEMP_DIR, '*.log')))
+        call_command('send_outbox', stdout=StringIO())
+        self.assertFalse(OutboxMessage.objects.exists())
+        [log] = glob.glob(os.path.join(TEMP_DIR, '*.log'))
+        with open(log, encoding='utf-8') as log_file:
+            delivered = log_file.read()
+        self.assertIn('To: reader@yatube.ru', delivered)
+        self.assertIn('/auth/reset/', delivered)
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend'
+    )
+    def test_smtp_delivery(self):
+        """Письмо из очереди уходит через SMTP-бэкенд со строками
+        через CRLF."""
+        self.request_reset()
+        with mock.patch('smtplib.SMTP') as smtp:
+            call_command('send_outbox', stdout=StringIO())
+        self.assertFalse(OutboxMessage.objects.exists())
+        sendmail = smtp.return_value.sendmail
+        sendmail.assert_called_once()
+        from_email, recipients, content = sendmail.call_args[0]
+        self.assertEqual(recipients, ['reader@yatube.ru'])
+        self.assertIn(b'To: reader@yatube.ru\r\n', content)
+        self.assertNotIn(b'\r\r', content)
+
+    @override_settings(OUTBOX_EMAIL_BACKEND='core.tests.FailingEmailBackend')
+    def test_failed_delivery_is_retried_later(self):
+        """Неудачная отправка откладывает письмо до следующей попытки."""
+        self.request_reset()
+        call_command('send_outbox', stdout=StringIO())
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt, timezone.now())
+        self.assertIn('ConnectionError', message.last_error)
+
+
+class SessionCacheTestClass(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user(
+            username='reader', password='secret'
+        )
+        self.client.login(username='reader', password='secret')
+
+    def auth_queries(self, url='/about/author/'):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'django_session' in query['sql']
+            or 'auth_user' in query['sql']
+        ]
+
+    def test_warm_cache_skips_session_and_user_queries(self):
+        """С прогретым кешем страница не читает сессию и пользователя."""
+        cache.clear()
+        self.assertNotEqual(self.auth_queries(), [])
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_password_change_drops_cached_user(self):
+        """Смена пароля разлогинивает старые сессии и с кешем."""
+        self.auth_queries()
+        self.user.set_password('new-secret')
+        self.user.save()
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_change_in_other_process_drops_cached_user(self):
+        """Сохранение пользователя в другом процессе сбрасывает его
+        копию в локальном кеше этого процесса."""
+        self.auth_queries()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        process = multiprocessing.get_context('fork').Process(
+            target=invalidate_cached_user, args=(User, self.user)
+        )
+        process.start()
+        process.join()
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_unchanged_session_is_not_written(self):
+        """Запись той же самой информации не доходит до базы."""
+        session = SessionStore(self.client.session.session_key)
+        session['theme'] = 'dark'
+        session.save()
+        session = SessionStore(session.session_key)
+        session['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_expiring_session_is_extended(self):
+        """Сессия, срок которой подходит к концу, продлевается."""
+        key = self.client.session.session_key
+        cache.clear()
+        Session.objects.filter(session_key=key).update(
+            expire_date=timezone.now() + timedelta(hours=1)
+        )
+        session = SessionStore(key)
+        session.load()
+        self.assertTrue(session.modified)
+        session.save()
+        self.assertGreater(
+            Session.objects.get(session_key=key).expire_date,
+            timezone.now() + timedelta(days=7),
+        )
+
+
+class BackupTestClass(TransactionTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        Post.objects.create(
+            text='Текст',
+            author=User.objects.create_user(username='testuser'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def backup(self, *args):
+        output = StringIO()
+        call_command(
+            'backup_db', *args, dir=self.directory, pages=1, pause=0,
+            stdout=output,
+        )
+        return output.getvalue()
+
+    def test_backup_contains_data(self):
+        """Копия — рабочая база с данными сайта, сжатая и несжатая."""
+        self.backup()
+        self.backup('--compress')
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 2)
+        plain = next(name for name in names if name.endswith('.sqlite3'))
+        copy = sqlite3.connect(os.path.join(self.directory, plain))
+        try:
+            self.assertEqual(copy.execute(
+                'SELECT text FROM posts_post'
+            ).fetchall(), [('Текст',)])
+        finally:
+            copy.close()
+        packed = next(name for name in names if name.endswith('.gz'))
+        output = StringIO()
+        call_command(
+            'backup_db', check=os.path.join(self.directory, packed),
+            stdout=output,
+        )
+        self.assertIn('Копия исправна', output.getvalue())
+
+    def test_old_backups_are_rotated(self):
+        """Хранятся только keep последних копий."""
+        for day in range(1, 4):
+            open(os.path.join(
+                self.directory, f'db-2020010{day}-000000.sqlite3'
+            ), 'w').close()
+        self.backup('--keep', '2')
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 2)
+        self.assertEqual(names[0], 'db-20200103-000000.sqlite3')
+
+    def test_broken_backup_is_rejected(self):
+        """Проверка восстановления не пропускает битую копию."""
+        path = os.path.join(self.directory, 'db-20200101-000000.sqlite3')
+        with open(path, 'wb') as broken:
+            broken.write(b'not a database' * 100)
+        with self.assertRaises(CommandError):
+            call_command('backup_db', check=path, stdout=StringIO())
+
+    def copy_under_writes(self, writes, journal_mode='delete'):
+        """Копирует базу, делая запись из другого соединения после
+        каждого из первых writes шагов."""
+        path = os.path.join(self.directory, 'source.sqlite3')
+        source = sqlite3.connect(path)
+        source.execute(f'PRAGMA journal_mode = {journal_mode}')
+        source.execute('CREATE TABLE item (value TEXT)')
+        source.executemany(
+            'INSERT INTO item VALUES (?)', [('x' * 1000,)] * 50
+        )
+        source.commit()
+        writer = sqlite3.connect(path)
+        target = sqlite3.connect(':memory:')
+        steps = []
+
+        def write(copied, total):
+            steps.append(copied)
+            if len(steps) <= writes:
+                writer.execute("INSERT INTO item VALUES ('new')")
+                writer.commit()
+
+        try:
+            restarts = copy_pages(
+                source, target, 1, 0, progress=write, rounds=2,
+                retry_delay=0,
+            )
+            count = 'SELECT COUNT(*) FROM item'
+            self.assertEqual(
+                target.execute(count).fetchone(),
+                source.execute(count).fetchone(),
+            )
+            return restarts
+        finally:
+            for sqlite_connection in (source, writer, target):
+                sqlite_connection.close()
+
+    def test_copy_finishes_under_writes(self):
+        """Запись из другого соединения перезапускает копирование;
+        после паузы проход повторяется, и копия совпадает с базой."""
+        restarts = self.copy_under_writes(MAX_RESTARTS)
+        self.assertEqual(restarts, MAX_RESTARTS)
+
+    def test_copy_gives_up_without_blocking_writers(self):
+        """С журналом отката база не копируется одним шагом: при
+        непрерывной записи копирование отменяется."""
+        with self.assertRaises(BackupError):
+            self.copy_under_writes(writes=10 ** 6)
+
+    def test_wal_copy_falls_back_to_single_step(self):
+        """В режиме WAL чтение не блокирует запись, и после
+        перезапусков база копируется одним шагом."""
+        restarts = self.copy_under_writes(writes=10 ** 6, journal_mode='wal')
+        self.assertEqual(restarts, MAX_RESTARTS)
+
+    def test_failed_check_is_not_rotated(self):
+        """Копия, не прошедшая проверку, получает суффикс .bad
+        и не считается в --keep."""
+        with mock.patch(
+            'core.management.commands.backup_db.check_backup',
+            side_effect=BackupError('Копия повреждена'),
+        ):
+            with self.assertRaises(CommandError):
+                self.backup()
+        [bad] = os.listdir(self.directory)
+        self.assertTrue(bad.endswith('.sqlite3.bad'))
+        self.assertEqual(rotate(self.directory, keep=0), [])
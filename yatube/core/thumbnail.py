@@ -0,0 +1,125 @@
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.helpers import get_module_class, serialize, tokey
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .instrumentation import count, timed
+from .metrics import registry
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timed('thumbnail'):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, *args, **kwargs):
+        registry.inc('yatube_thumbnails_generated_total')
+        return super()._create_thumbnail(*args, **kwargs)
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile миниатюры без обращений к хранилищу: имя
+        вычисляется так же, как в get_thumbnail."""
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+def get_raw_many(keys):
+    """Значения key-value хранилища sorl: один get_many к кешу
+    и один запрос к базе для ключей, которых нет в кеше."""
+    kvstore = default.kvstore
+    kv_cache = getattr(kvstore, 'cache', None)
+    if kv_cache is None:
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if values.get(key) in (None, EMPTY_VALUE)]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kv_cache.set_many(found, settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {
+        key: value for key, value in values.items()
+        if value not in (None, EMPTY_VALUE)
+    }
+
+
+def enqueue_thumbnails(files, geometry_string, options):
+    from .models import ThumbnailTask
+
+    serialized = serialize(options)
+    tasks = []
+    for file_ in files:
+        storage = ImageFile(file_).serialize_storage()
+        tasks.append(ThumbnailTask(
+            key=tokey(file_.name, storage, geometry_string, serialized),
+            source=file_.name,
+            storage=storage,
+            geometry=geometry_string,
+            options=serialized,
+        ))
+    ThumbnailTask.objects.bulk_create(tasks, ignore_conflicts=True)
+
+
+def task_source(task):
+    """Исходный файл задачи в том хранилище, откуда он был загружен."""
+    if not task.storage:
+        return task.source
+    return ImageFile(task.source, get_module_class(task.storage)())
+
+
+def resolve_thumbnails(files, geometry_string, **options):
+    """Находит миниатюры для всех файлов страницы разом.
+
+    Возвращает словарь {имя файла: ImageFile или None}. Миниатюры,
+    которых ещё нет, не генерируются в запросе, а ставятся в очередь
+    для команды generate_thumbnails. Время попадает в Server-Timing
+    как thumb, счётчик — число файлов страницы.
+    """
+    with timed('thumbnail', counted=False) as outer:
+        resolved = find_thumbnails(files, geometry_string, options)
+    if outer:
+        count('thumbnail', len(resolved))
+    return resolved
+
+
+def find_thumbnails(files, geometry_string, options):
+    thumbnails = {}
+    sources = {}
+    for file_ in files:
+        if file_ and file_.name not in thumbnails:
+            sources[file_.name] = file_
+            thumbnails[file_.name] = default.backend.thumbnail_file(
+                file_, geometry_string, **options
+            )
+    if not thumbnails:
+        return {}
+    keys = {
+        add_prefix(thumbnail.key): name
+        for name, thumbnail in thumbnails.items()
+    }
+    values = get_raw_many(list(keys))
+    resolved = {}
+    for key, name in keys.items():
+        value = values.get(key)
+        resolved[name] = deserialize_image_file(value) if value else None
+    missing = [
+        sources[name] for name, thumbnail in resolved.items() if not thumbnail
+    ]
+    if missing:
+        enqueue_thumbnails(missing, geometry_string, options)
+    return resolved
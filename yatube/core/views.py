@@ -1,5 +1,12 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from .media import media_response
+from .metrics import collect, registry
+from .metrics import render as render_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +22,18 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise PermissionDenied
+    registry.flush(force=True)
+    counters, histograms = collect(settings.METRICS_DIR)
+    return HttpResponse(
+        render_metrics(counters, histograms),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def serve_media(request, path):
+    return media_response(request, path)
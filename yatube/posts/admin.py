@@ -1,15 +1,87 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
-from .models import Post, Group
+from .models import Post, Group, User
+from .utils import EstimatedCountPaginator
+
+
+class PrefetchedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, который берёт подписи уже загруженных объектов
+    вместо отдельного запроса на каждую строку списка."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.labels = {}
+
+    def optgroups(self, name, value, attr=None):
+        selected = [item for item in value if item]
+        if any(item not in self.labels for item in selected):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for item in selected:
+            options.append(self.create_option(
+                name, item, self.labels[item], True, len(options)
+            ))
+        return [(None, options, 0)]
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'group', 'text', 'pub_date', 'author')
+    list_select_related = ('group', 'author')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    autocomplete_fields = ('group', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = PrefetchedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+
+        class ChangeListFormSet(formset):
+            def __init__(self, *args, queryset=None, **kwargs):
+                super().__init__(*args, queryset=queryset, **kwargs)
+                widget = self.form.base_fields['group'].widget
+                getattr(widget, 'widget', widget).labels.update(
+                    (str(post.group_id), str(post.group))
+                    for post in queryset or ()
+                    if post.group_id
+                )
+
+        return ChangeListFormSet
+
+    def get_search_results(self, request, queryset, search_term):
+        """Номер поста, имя автора и slug группы ищутся по индексу,
+        поиск по тексту выполняется только для остальных запросов."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=term), False
+        if User.objects.filter(username=term).exists():
+            return queryset.filter(author__username=term), False
+        if Group.objects.filter(slug=term).exists():
+            return queryset.filter(group__slug=term), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from core.storage import retain
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Post,
+                     PostRevision)
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_CHUNK_SIZE = 500
+
+
+def _copy(instance, model):
+    return model(**{
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields
+    })
+
+
+def archive_chunk(cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """Переносит в архив одну пачку постов старше cutoff вместе
+    с комментариями. Пачка переносится в одной транзакции, поэтому
+    прерванный перенос можно просто запустить заново.
+
+    Отредактированные посты остаются в оперативной таблице: удаление
+    поста удалило бы и историю его правок."""
+    with transaction.atomic():
+        posts = list(Post.objects.annotate(edited=Exists(
+            PostRevision.objects.filter(post=OuterRef('pk'))
+        )).filter(
+            pub_date__lt=cutoff, edited=False
+        ).order_by('pk')[:chunk_size])
+        if not posts:
+            return 0
+        post_ids = [post.pk for post in posts]
+        ArchivedPost.objects.bulk_create(
+            [_copy(post, ArchivedPost) for post in posts],
+            ignore_conflicts=True,
+        )
+        ArchivedComment.objects.bulk_create(
+            [
+                _copy(comment, ArchivedComment)
+                for comment in Comment.objects.filter(post_id__in=post_ids)
+            ],
+            ignore_conflicts=True,
+        )
+        for post in posts:
+            retain(post.image.name)
+        Post.objects.filter(pk__in=post_ids).delete()
+    return len(posts)
+
+
+def archive_posts(cutoff=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    if cutoff is None:
+        cutoff = timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    while True:
+        moved = archive_chunk(cutoff, chunk_size)
+        if not moved:
+            return
+        yield moved
+
+
+def get_post_or_archived(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        post = ArchivedPost.objects.filter(pk=post_id).first()
+    if post is None:
+        raise Http404('Пост не найден')
+    return post
+
+
+class QuerySetChain:
+    """Несколько упорядоченных выборок как одна последовательность
+    для Paginator: сначала оперативная таблица, затем архив."""
+
+    ordered = True
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+
+    @cached_property
+    def counts(self):
+        return [queryset.count() for queryset in self.querysets]
+
+    def count(self):
+        return sum(self.counts)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        items = []
+        offset = 0
+        for queryset, count in zip(self.querysets, self.counts):
+            if start < offset + count and stop > offset:
+                items.extend(queryset[
+                    max(start - offset, 0):min(stop - offset, count)
+                ])
+            offset += count
+        return items
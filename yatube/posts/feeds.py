@@ -0,0 +1,31 @@
+from django.utils.dateparse import parse_datetime
+
+from core.pagination import CursorPaginator
+
+from .following import get_followed_group_ids, get_following_ids
+from .models import Post
+
+feed_pages = CursorPaginator('pub_date', parse=parse_datetime)
+
+
+def followed_sources(user):
+    """Отдельная выборка на каждого автора и каждую группу подписок:
+    каждая идёт по своему индексу (автор или группа, дата)."""
+    sources = [
+        Post.objects.filter(author_id=author_id)
+        for author_id in sorted(get_following_ids(user))
+    ]
+    sources += [
+        Post.objects.filter(group_id=group_id)
+        for group_id in sorted(get_followed_group_ids(user))
+    ]
+    return sources
+
+
+def followed_feed(user, request, limit):
+    """Страница ленты подписок на авторов и группы и курсор следующей:
+    источники сливаются по дате, пост автора из группы подписок
+    показывается один раз."""
+    pks, cursor = feed_pages.merge(followed_sources(user), request, limit)
+    posts = Post.objects.select_related('group', 'author').in_bulk(pks)
+    return [posts[pk] for pk in pks if pk in posts], cursor
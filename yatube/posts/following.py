@@ -0,0 +1,53 @@
+from django.core.cache import cache
+
+from .models import Follow, GroupFollow
+
+FOLLOWING_TIMEOUT = 60 * 60
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def get_following_ids(user):
+    """Возвращает множество id авторов, на которых подписан пользователь.
+
+    Множество читается одним запросом и хранится в кеше, поэтому кнопки
+    подписки на всех карточках страницы не требуют отдельных запросов.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = following_key(user.pk)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = frozenset(Follow.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True))
+        cache.set(key, author_ids, FOLLOWING_TIMEOUT)
+    return author_ids
+
+
+def followed_groups_key(user_id):
+    return f'followed_groups:{user_id}'
+
+
+def get_followed_group_ids(user):
+    """Множество id групп, на которые подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = followed_groups_key(user.pk)
+    group_ids = cache.get(key)
+    if group_ids is None:
+        group_ids = frozenset(GroupFollow.objects.filter(
+            user=user
+        ).values_list('group_id', flat=True))
+        cache.set(key, group_ids, FOLLOWING_TIMEOUT)
+    return group_ids
+
+
+def invalidate_following(user_id):
+    cache.delete(following_key(user_id))
+
+
+def invalidate_followed_groups(user_id):
+    cache.delete(followed_groups_key(user_id))
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+
+from django.conf import settings
+
+from core.metrics import registry
+
+from .models import Post
+
+CHANGES_LIMIT = 500
+
+
+def changes(since_id, limit=CHANGES_LIMIT):
+    """Посты с pk больше since_id: диапазон по первичному ключу,
+    без сортировки по дате и без COUNT(*)."""
+    return list(
+        Post.objects.filter(pk__gt=since_id)
+        .order_by('pk')
+        .values('pk', 'author_id', 'group_id')[:limit]
+    )
+
+
+def latest_id():
+    return Post.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+class Subscription:
+    """Подписка одного SSE-клиента: фильтр ленты и очередь новых pk.
+
+    Пост проходит фильтр авторов author_ids и тогда, когда он
+    из группы group_ids, как в ленте подписок.
+    """
+
+    def __init__(self, group_id=None, author_ids=None, group_ids=frozenset()):
+        self.group_id = group_id
+        self.author_ids = author_ids
+        self.group_ids = group_ids
+        self.queue = queue.Queue()
+
+    def matches(self, change):
+        if self.group_id is not None and change['group_id'] != self.group_id:
+            return False
+        if (
+            self.author_ids is not None
+            and change['author_id'] not in self.author_ids
+            and change['group_id'] not in self.group_ids
+        ):
+            return False
+        return True
+
+    def push(self, changes):
+        ids = [change['pk'] for change in changes if self.matches(change)]
+        if ids:
+            self.queue.put(ids)
+
+    def get(self, timeout):
+        """Все накопившиеся pk одним списком."""
+        ids = self.queue.get(timeout=timeout)
+        while True:
+            try:
+                ids += self.queue.get_nowait()
+            except queue.Empty:
+                return ids
+
+
+class LiveFeed:
+    """Общий для процесса опрос новых постов.
+
+    Отдельного потока нет: опрашивает базу тот поток SSE, который первым
+    обнаружит, что интервал истёк, а найденные изменения раскладываются
+    по очередям всех подключённых клиентов. Сколько бы ни было клиентов,
+    процесс делает не больше одного запроса за интервал.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.poll_lock = threading.Lock()
+        self.subscriptions = set()
+        self.last_id = None
+        self.polled_at = 0.0
+
+    @property
+    def interval(self):
+        return getattr(settings, 'LIVE_FEED_POLL_INTERVAL', 2)
+
+    def subscribe(self, subscription, since_id=None):
+        """Подключает клиента; since_id (Last-Event-ID) досылает
+        пропущенное за время переподключения."""
+        with self.lock:
+            if not self.subscriptions:
+                self.last_id = latest_id()
+                self.polled_at = time.monotonic()
+            self.subscriptions.add(subscription)
+            last_id = self.last_id
+        if since_id is not None and since_id < last_id:
+            subscription.push([
+                change for change in changes(since_id)
+                if change['pk'] <= last_id
+            ])
+        return last_id
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def poll(self):
+        found = changes(self.last_id)
+        registry.inc('yatube_live_feed_polls_total')
+        if not found:
+            return 0
+        with self.lock:
+            self.last_id = found[-1]['pk']
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(found)
+        return len(found)
+
+    def poll_if_due(self):
+        if not self.poll_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self.polled_at >= self.interval:
+                self.polled_at = time.monotonic()
+                self.poll()
+        finally:
+            self.poll_lock.release()
+
+    def wait(self, subscription, timeout):
+        """Ждёт новых pk для клиента не дольше timeout секунд."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll_if_due()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                return subscription.get(min(self.interval, remaining))
+            except queue.Empty:
+                pass
+
+
+live_feed = LiveFeed()
@@ -0,0 +1,98 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.shortcuts import get_object_or_404
+
+from .models import Group, User
+
+LOOKUP_CACHE_SIZE = 1024
+LOOKUP_CACHE_TTL = 60
+
+
+class LRUCache:
+    """Локальный для процесса LRU-кеш с TTL.
+
+    Каждая запись помнит версию из общего для процессов кеша
+    shared на момент загрузки. Изменение объекта в любом процессе
+    меняет версию, и все локальные записи этой модели перестают
+    считаться актуальными.
+    """
+
+    def __init__(self, version_key, maxsize=LOOKUP_CACHE_SIZE,
+                 ttl=LOOKUP_CACHE_TTL):
+        self.version_key = version_key
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        shared = caches['shared']
+        version = shared.get(self.version_key)
+        if version is None:
+            shared.add(self.version_key, uuid.uuid4().hex, None)
+            version = shared.get(self.version_key)
+        return version
+
+    def bump_version(self):
+        caches['shared'].set(self.version_key, uuid.uuid4().hex, None)
+        self.clear()
+
+    def get(self, key, loader):
+        version = self.version()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > now and entry[2] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = loader()
+        with self.lock:
+            self.entries[key] = (value, now + self.ttl, version)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.entries),
+        }
+
+
+group_cache = LRUCache('lookup_version:group')
+user_cache = LRUCache('lookup_version:user')
+
+
+def get_group(slug):
+    return group_cache.get(
+        slug, lambda: get_object_or_404(Group, slug=slug)
+    )
+
+
+def get_author(username):
+    return user_cache.get(
+        username, lambda: get_object_or_404(User, username=username)
+    )
+
+
+def lookup_stats():
+    return {
+        'group': group_cache.stats(),
+        'user': user_cache.stats(),
+    }
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_CHUNK_SIZE, archive_posts
+from posts.models import Post
+from posts.utils import analyze_table
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты и комментарии к ним в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument(
+            '--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for moved in archive_posts(cutoff, options['chunk_size']):
+            total += moved
+            self.stdout.write(f'Перенесено постов: {total}')
+        if total:
+            # Оценка числа постов в админке берётся из статистики таблицы
+            analyze_table(Post)
+        self.stdout.write(f'Архивация завершена, всего: {total}')
@@ -0,0 +1,75 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import Context, engines
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+
+INCLUDE_TEMPLATE = (
+    '{% for post in page_obj %}'
+    "{% include 'posts/includes/article.html' "
+    'with show_author_link=True show_group_link=True %}'
+    '{% endfor %}'
+)
+TAG_TEMPLATE = (
+    '{% load post_cards %}'
+    '{% for post in page_obj %}'
+    '{% post_card post show_author_link=True show_group_link=True %}'
+    '{% endfor %}'
+)
+
+
+def make_posts(count):
+    """Посты в памяти, без обращений к базе."""
+    group = Group(pk=1, title='Группа', slug='group')
+    now = timezone.now()
+    posts = [
+        Post(
+            pk=index,
+            text='Строка текста\n' * 20,
+            author=User(pk=index % 7 + 1, username=f'user{index % 7}'),
+            group=group,
+            pub_date=now,
+        )
+        for index in range(1, count + 1)
+    ]
+    for post in posts:
+        post.render_text()
+    return posts
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает рендеринг ленты через include и через post_card'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 50, 100]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        engine = engines['django'].engine
+        templates = {
+            'include': engine.from_string(INCLUDE_TEMPLATE),
+            'post_card': engine.from_string(TAG_TEMPLATE),
+        }
+        for size in options['sizes']:
+            posts = make_posts(size)
+            results = {}
+            for name, compiled in templates.items():
+                def render():
+                    compiled.render(Context({
+                        'page_obj': posts, 'user': AnonymousUser()
+                    }))
+                render()
+                results[name] = min(timeit.repeat(
+                    render, number=1, repeat=options['repeat']
+                ))
+            self.stdout.write(
+                f'{size:>4} постов: '
+                f'include {results["include"] * 1000:.2f} мс, '
+                f'post_card {results["post_card"] * 1000:.2f} мс, '
+                f'ускорение {results["include"] / results["post_card"]:.1f}x'
+            )
@@ -0,0 +1,56 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import resolve
+
+from .bench_post_cards import make_posts
+
+PAGES = {
+    'posts/index.html': {},
+    'posts/group_list.html': {},
+    'posts/profile.html': {'following': False},
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает рендеринг страниц ленты в Django и Jinja2'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if 'jinja2' not in engines:
+            raise CommandError('Шаблонизатор jinja2 не настроен')
+        posts = make_posts(options['size'])
+        page_obj = Paginator(posts, options['size']).page(1)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.resolver_match = resolve('/')
+        for name, extra in PAGES.items():
+            context = {
+                'page_obj': page_obj,
+                'group': posts[0].group,
+                'author': posts[0].author,
+                **extra,
+            }
+            results = {}
+            for alias in ('django', 'jinja2'):
+                template = engines[alias].get_template(name)
+
+                def render():
+                    template.render(context, request)
+                render()
+                results[alias] = min(timeit.repeat(
+                    render, number=1, repeat=options['repeat']
+                ))
+            self.stdout.write(
+                f'{name}: '
+                f'django {results["django"] * 1000:.2f} мс, '
+                f'jinja2 {results["jinja2"] * 1000:.2f} мс, '
+                f'ускорение {results["django"] / results["jinja2"]:.1f}x'
+            )
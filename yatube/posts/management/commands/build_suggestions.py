@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import (
+    SUGGESTIONS_BATCH_SIZE, build_suggestions, refresh_stale_suggestions
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «Кого почитать» для всех подписчиков'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SUGGESTIONS_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Пересчитать только рекомендации, устаревшие после '
+                 'подписок и отписок'
+        )
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            total = refresh_stale_suggestions(options['batch_size'])
+        else:
+            total = build_suggestions(options['batch_size'])
+        self.stdout.write(f'Рекомендации обновлены для {total} пользователей')
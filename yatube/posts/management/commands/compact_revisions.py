@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.revisions import (
+    COMPACT_AFTER_DAYS, COMPACT_CHUNK_SIZE, compact_revisions
+)
+
+
+class Command(BaseCommand):
+    help = 'Схлопывает старые редакции постов в один снимок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=COMPACT_AFTER_DAYS,
+            help='Сжимать редакции старше этого числа дней',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=COMPACT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for posts, removed in compact_revisions(
+            cutoff, options['chunk_size']
+        ):
+            total += removed
+            self.stdout.write(
+                f'Постов: {posts}, удалено редакций: {removed}'
+            )
+        self.stdout.write(f'Сжатие завершено, удалено редакций: {total}')
@@ -0,0 +1,59 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import StoredFile
+from core.storage import content_storage, delete_file, is_content_name
+from posts.models import ArchivedPost, Post
+
+MODELS = (Post, ArchivedPost)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по содержимому '
+        'и пересчитывает ссылки на файлы'
+    )
+
+    def legacy_names(self):
+        names = set()
+        for model in MODELS:
+            names.update(model.objects.exclude(image='').values_list(
+                'image', flat=True
+            ).distinct())
+        return sorted(name for name in names if not is_content_name(name))
+
+    def move(self, name):
+        with content_storage.open(name) as source:
+            new_name = content_storage.save(name, source)
+        with transaction.atomic():
+            for model in MODELS:
+                model.objects.filter(image=name).update(image=new_name)
+        delete_file(name)
+        return new_name
+
+    def rebuild_references(self):
+        references = Counter()
+        for model in MODELS:
+            references.update(model.objects.exclude(image='').values_list(
+                'image', flat=True
+            ).iterator())
+        with transaction.atomic():
+            StoredFile.objects.all().delete()
+            StoredFile.objects.bulk_create(
+                StoredFile(name=name, references=count)
+                for name, count in references.items()
+                if is_content_name(name)
+            )
+
+    def handle(self, *args, **options):
+        for name in self.legacy_names():
+            if not content_storage.exists(name):
+                self.stderr.write(f'Файл не найден: {name}')
+                continue
+            self.stdout.write(f'{name} -> {self.move(name)}')
+        self.rebuild_references()
+        self.stdout.write(
+            f'Готово: в хранилище {StoredFile.objects.count()} файлов'
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import ArchivedPost, Post
+from posts.rendering import RENDER_CHUNK_SIZE, render_posts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет HTML и анонсы постов, сохранённых до их появления'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=RENDER_CHUNK_SIZE
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перерисовать все посты, а не только пустые',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, ArchivedPost):
+            name = model._meta.verbose_name_plural
+            for last_pk in render_posts(
+                model, options['chunk_size'], options['force']
+            ):
+                self.stdout.write(f'{name}: обработано до pk={last_pk}')
+        self.stdout.write('Готово')
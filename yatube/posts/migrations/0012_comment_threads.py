@@ -0,0 +1,89 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:44
+
+from django.db import migrations, models
+from django.utils.http import int_to_base36
+import django.db.models.deletion
+
+# Копия posts.models.path_segment на момент миграции: миграция
+# не должна зависеть от текущего кода моделей
+PATH_SEGMENT_WIDTH = 7
+PATH_SEGMENT_MAX = 36 ** PATH_SEGMENT_WIDTH - 1
+
+
+def root_path_segment(pk):
+    return int_to_base36(PATH_SEGMENT_MAX - pk).zfill(PATH_SEGMENT_WIDTH)
+
+
+def fill_paths(apps, schema_editor):
+    # До веток все комментарии были корневыми
+    for name in ('Comment', 'ArchivedComment'):
+        model = apps.get_model('posts', name)
+        for pk in model.objects.values_list('pk', flat=True).iterator():
+            model.objects.filter(pk=pk).update(path=root_path_segment(pk))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_content_storage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='archivedcomment',
+            options={'ordering': ('path',)},
+        ),
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ('path',)},
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.ArchivedComment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=42),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=42),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'path'], name='posts_archivedcomment_thread'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='posts_comment_thread'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0014_group_follows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSuggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='suggestions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('author_ids', models.TextField(default='[]', verbose_name='Авторы')),
+                ('stale', models.BooleanField(db_index=True, default=False, verbose_name='Устарели')),
+            ],
+        ),
+    ]
@@ -1,8 +1,31 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaksbr
+from django.utils.http import int_to_base36
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from core.storage import content_storage
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 300
+TITLE_LENGTH = 30
+MAX_COMMENT_DEPTH = 5
+PATH_SEGMENT_WIDTH = 7
+PATH_SEGMENT_MAX = 36 ** PATH_SEGMENT_WIDTH - 1
+PATH_END = '~'
+COMMENT_INDENT = 2
+
+
+def path_segment(pk, root):
+    """Сегмент пути фиксированной ширины в base36. У корневых
+    комментариев он инвертирован: новые ветки идут первыми, а ответы
+    внутри ветки — по порядку."""
+    value = PATH_SEGMENT_MAX - pk if root else pk
+    return int_to_base36(value).zfill(PATH_SEGMENT_WIDTH)
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -21,7 +44,63 @@ class Group(models.Model):
         return str(self.title)
 
 
-class Post(models.Model):
+class RenderedText(models.Model):
+    """Текст поста, заранее преобразованный в HTML при сохранении."""
+
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False,
+    )
+    excerpt = models.TextField(
+        'Анонс',
+        blank=True,
+        editable=False,
+        help_text='HTML начала текста; пусто, если текст короткий',
+    )
+
+    class Meta:
+        abstract = True
+
+    def render_text(self):
+        self.text_html = linebreaksbr(self.text)
+        excerpt = Truncator(self.text).chars(EXCERPT_LENGTH)
+        self.excerpt = linebreaksbr(excerpt) if excerpt != self.text else ''
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'text_html', 'excerpt'
+                }
+        super().save(*args, **kwargs)
+
+    @property
+    def body_html(self):
+        if not self.text_html:
+            return linebreaksbr(self.text)
+        return mark_safe(self.text_html)
+
+    @property
+    def excerpt_html(self):
+        if not self.text_html:
+            return linebreaksbr(Truncator(self.text).chars(EXCERPT_LENGTH))
+        return mark_safe(self.excerpt or self.text_html)
+
+    @property
+    def is_truncated(self):
+        if not self.text_html:
+            return len(self.text) > EXCERPT_LENGTH
+        return bool(self.excerpt)
+
+    @property
+    def title(self):
+        return Truncator(self.text[:TITLE_LENGTH + 1]).chars(TITLE_LENGTH)
+
+
+class Post(RenderedText):
     text = models.TextField(
         default='Ваш текст',
         verbose_name='Текст',
@@ -50,17 +129,84 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
 
+    is_archived = False
+
     def __str__(self):
         return f'{self.text[:15]}'
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='posts_post_author_feed'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'], name='posts_post_group_feed'
+            ),
+        ]
+
+
+class ThreadedComment(models.Model):
+    """Ветка комментариев в виде материализованного пути: path состоит
+    из сегментов всех предков, поэтому вся ветка поста или любое
+    поддерево читается одним запросом по диапазону индекса
+    (post, path)."""
+
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
+    path = models.CharField(
+        max_length=PATH_SEGMENT_WIDTH * (MAX_COMMENT_DEPTH + 1),
+        blank=True,
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    replies_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None or self.path:
+            return super().save(*args, **kwargs)
+        if self.parent is not None and self.parent.depth >= MAX_COMMENT_DEPTH:
+            self.parent = self.parent.parent
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.parent is None:
+                self.depth = 0
+                self.path = path_segment(self.pk, root=True)
+            else:
+                self.depth = self.parent.depth + 1
+                self.path = self.parent.path + path_segment(
+                    self.pk, root=False
+                )
+                type(self).objects.filter(pk=self.parent_id).update(
+                    replies_count=F('replies_count') + 1
+                )
+            type(self).objects.filter(pk=self.pk).update(
+                path=self.path, depth=self.depth
+            )
 
+    @property
+    def indent(self):
+        return self.depth * COMMENT_INDENT
 
-class Comment(models.Model):
+    @property
+    def reply_indent(self):
+        return (self.depth + 1) * COMMENT_INDENT
+
+
+class Comment(ThreadedComment):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -81,12 +227,51 @@ class Comment(models.Model):
     )
 
     class Meta:
-        ordering = ('-created',)
+        ordering = ('path',)
+        indexes = [models.Index(
+            fields=['post', 'path'], name='posts_comment_thread'
+        )]
 
     def __str__(self):
         return str(self.text)
 
 
+class PostRevision(models.Model):
+    """Редакция поста: полный текст (снимок) или дельта
+    к предыдущей редакции в формате posts.revisions."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    number = models.PositiveIntegerField('Номер')
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Группа',
+    )
+    is_snapshot = models.BooleanField('Полный текст', default=False)
+    data = models.TextField('Текст или дельта')
+    created = models.DateTimeField(
+        'Дата правки',
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    class Meta:
+        ordering = ('-number',)
+        constraints = [models.UniqueConstraint(
+            fields=['post', 'number'], name='posts_revision_number'
+        )]
+
+    def __str__(self):
+        return f'{self.post_id} #{self.number}'
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -98,3 +283,104 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'group'], name='posts_groupfollow_unique'
+        )]
+
+
+class UserSuggestions(models.Model):
+    """Рекомендации «Кого почитать»: id авторов в JSON по убыванию
+    веса. stale отмечает рекомендации, устаревшие после подписки или
+    отписки: их пересчитывает build_suggestions --stale."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='suggestions',
+    )
+    author_ids = models.TextField('Авторы', default='[]')
+    stale = models.BooleanField('Устарели', default=False, db_index=True)
+
+
+class ArchivedPost(RenderedText):
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(
+        verbose_name='Текст',
+    )
+    pub_date = models.DateTimeField(
+        db_index=True,
+        verbose_name='Дата публикации',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=content_storage,
+        blank=True
+    )
+
+    is_archived = True
+
+    def __str__(self):
+        return f'{self.text[:15]}'
+
+    class Meta:
+        ordering = ['-pub_date']
+
+
+class ArchivedComment(ThreadedComment):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    text = models.TextField(
+        verbose_name='Текст',
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('path',)
+        indexes = [models.Index(
+            fields=['post', 'path'], name='posts_archivedcomment_thread'
+        )]
+
+    def __str__(self):
+        return str(self.text)
@@ -0,0 +1,30 @@
+from django.db import transaction
+
+RENDER_CHUNK_SIZE = 500
+
+
+def render_chunk(model, after_pk, chunk_size, force=False):
+    """Заполняет text_html и excerpt у одной пачки постов с pk больше
+    after_pk. Возвращает pk последнего обработанного поста или None."""
+    queryset = model.objects.order_by('pk').filter(pk__gt=after_pk)
+    if not force:
+        queryset = queryset.filter(text_html='')
+    with transaction.atomic():
+        posts = list(queryset.only('pk', 'text')[:chunk_size])
+        if not posts:
+            return None
+        for post in posts:
+            post.render_text()
+        model.objects.bulk_update(posts, ('text_html', 'excerpt'))
+    return posts[-1].pk
+
+
+def render_posts(model, chunk_size=RENDER_CHUNK_SIZE, force=False):
+    """Проходит таблицу пачками по возрастанию pk, не держа
+    блокировку дольше одной пачки."""
+    last_pk = 0
+    while True:
+        last_pk = render_chunk(model, last_pk, chunk_size, force)
+        if last_pk is None:
+            return
+        yield last_pk
@@ -0,0 +1,186 @@
+import json
+import re
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, PostRevision
+
+SNAPSHOT_INTERVAL = 10
+COMPACT_AFTER_DAYS = 90
+COMPACT_CHUNK_SIZE = 100
+TOKEN = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def tokenize(text):
+    return TOKEN.findall(text)
+
+
+def opcodes(old, new):
+    old, new = tokenize(old), tokenize(new)
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        yield tag, old[i1:i2], new[j1:j2]
+
+
+def make_delta(old, new):
+    """Дельта между текстами по словам: положительное число —
+    скопировать столько токенов старого текста, отрицательное —
+    пропустить, строка — вставить."""
+    delta = []
+    for tag, removed, added in opcodes(old, new):
+        if tag == 'equal':
+            delta.append(len(removed))
+            continue
+        if removed:
+            delta.append(-len(removed))
+        if added:
+            delta.append(''.join(added))
+    return delta
+
+
+def apply_delta(text, delta):
+    tokens = tokenize(text)
+    position = 0
+    result = []
+    for operation in delta:
+        if isinstance(operation, str):
+            result.append(operation)
+        elif operation > 0:
+            result.extend(tokens[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return ''.join(result)
+
+
+def record_revision(post, previous_text, previous_group_id):
+    """Добавляет редакцию с текущим текстом поста после правки.
+
+    previous_text — текст до правки: от него считается дельта. У нового
+    поста истории нет, чтобы не хранить второй раз текст постов, которые
+    никогда не правят, поэтому при первой правке старый текст становится
+    первой редакцией с датой публикации поста. Снимок пишется каждые
+    SNAPSHOT_INTERVAL редакций или когда дельта не короче текста,
+    поэтому восстановление читает не больше SNAPSHOT_INTERVAL записей.
+    """
+    with transaction.atomic():
+        Post.objects.select_for_update().filter(pk=post.pk).exists()
+        numbers = post.revisions.aggregate(
+            last=Max('number'),
+            snapshot=Max('number', filter=Q(is_snapshot=True)),
+        )
+        last, snapshot = numbers['last'], numbers['snapshot']
+        if last is None:
+            first = PostRevision.objects.create(
+                post=post, number=1, group_id=previous_group_id,
+                is_snapshot=True, data=previous_text,
+            )
+            PostRevision.objects.filter(pk=first.pk).update(
+                created=post.pub_date
+            )
+            last = snapshot = 1
+        number = last + 1
+        data = json.dumps(
+            make_delta(previous_text, post.text),
+            ensure_ascii=False, separators=(',', ':'),
+        )
+        is_snapshot = (
+            number - snapshot >= SNAPSHOT_INTERVAL
+            or len(data) >= len(post.text)
+        )
+        return PostRevision.objects.create(
+            post=post, number=number, group_id=post.group_id,
+            is_snapshot=is_snapshot,
+            data=post.text if is_snapshot else data,
+        )
+
+
+def revision_texts(post_id, number):
+    """Тексты (предыдущей редакции или None, редакции number).
+
+    Цепочка читается одним запросом: от последнего снимка перед
+    редакцией number до неё самой.
+    """
+    revisions = PostRevision.objects.filter(post_id=post_id)
+    start = revisions.filter(
+        number__lt=number, is_snapshot=True
+    ).order_by('-number').values('number')[:1]
+    chain = list(revisions.filter(
+        number__lte=number,
+        number__gte=Coalesce(Subquery(start), Value(number)),
+    ).order_by('number'))
+    if not chain or chain[-1].number != number:
+        raise PostRevision.DoesNotExist(
+            f'У поста {post_id} нет редакции {number}'
+        )
+    previous = text = None
+    for revision in chain:
+        previous = text
+        if revision.is_snapshot:
+            text = revision.data
+        else:
+            text = apply_delta(text, json.loads(revision.data))
+    return previous, text
+
+
+def diff_html(old, new):
+    """Разметка изменений: удалённое в <del>, добавленное в <ins>."""
+    if old is None:
+        return escape(new)
+    parts = []
+    for tag, removed, added in opcodes(old, new):
+        if tag == 'equal':
+            parts.append(escape(''.join(removed)))
+            continue
+        if removed:
+            parts.append(f'<del>{escape("".join(removed))}</del>')
+        if added:
+            parts.append(f'<ins>{escape("".join(added))}</ins>')
+    return mark_safe(''.join(parts))
+
+
+def compact_post(post_id, cutoff):
+    """Схлопывает редакции старше cutoff в одну: остаётся последняя
+    из них, переписанная полным снимком, поэтому более новые дельты
+    по-прежнему применяются к ней. Возвращает число удалённых."""
+    with transaction.atomic():
+        old = list(PostRevision.objects.select_for_update().filter(
+            post_id=post_id, created__lt=cutoff
+        ).order_by('number').only('pk', 'number', 'is_snapshot'))
+        if len(old) < 2:
+            return 0
+        keep = old[-1]
+        _, text = revision_texts(post_id, keep.number)
+        PostRevision.objects.filter(
+            pk__in=[revision.pk for revision in old[:-1]]
+        ).delete()
+        PostRevision.objects.filter(pk=keep.pk).update(
+            is_snapshot=True, data=text
+        )
+    return len(old) - 1
+
+
+def compact_revisions(cutoff, chunk_size=COMPACT_CHUNK_SIZE):
+    """Проходит посты с несколькими старыми редакциями пачками по
+    возрастанию pk; каждый пост сжимается в своей транзакции."""
+    last_post_id = 0
+    while True:
+        post_ids = list(
+            PostRevision.objects.filter(
+                created__lt=cutoff, post_id__gt=last_post_id
+            ).values('post_id').annotate(
+                count=Count('pk')
+            ).filter(count__gt=1).order_by('post_id').values_list(
+                'post_id', flat=True
+            )[:chunk_size]
+        )
+        if not post_ids:
+            return
+        removed = sum(compact_post(post_id, cutoff) for post_id in post_ids)
+        last_post_id = post_ids[-1]
+        yield len(post_ids), removed
@@ -0,0 +1,104 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.storage import release, retain
+
+from .following import invalidate_followed_groups, invalidate_following
+from .lookups import group_cache, user_cache
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, GroupFollow, Post,
+    User
+)
+from .revisions import record_revision
+from .suggestions import invalidate_suggestions
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    invalidate_following(instance.user_id)
+    invalidate_suggestions(instance.user_id)
+
+
+@receiver(post_save, sender=GroupFollow)
+@receiver(post_delete, sender=GroupFollow)
+def group_follow_changed(sender, instance, **kwargs):
+    invalidate_followed_groups(instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    group_cache.bump_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    user_cache.bump_version()
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=ArchivedPost)
+def remember_saved(sender, instance, update_fields=None, **kwargs):
+    """Запоминает сохранённые картинку, текст и группу: по ним post_save
+    решает, какой файл освободить и нужна ли новая редакция."""
+    if instance._state.adding:
+        return
+    fields = {'image', 'text', 'group'}
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    saved = sender.objects.filter(pk=instance.pk).values(
+        'image', 'text', 'group_id'
+    ).first()
+    if saved is None:
+        return
+    if 'image' in fields:
+        instance._saved_image = saved['image']
+    if sender is Post and fields & {'text', 'group'}:
+        instance._saved_version = (saved['text'], saved['group_id'])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=ArchivedPost)
+def image_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        retain(instance.image.name)
+        return
+    if not hasattr(instance, '_saved_image'):
+        return
+    saved = instance._saved_image
+    del instance._saved_image
+    if saved != instance.image.name:
+        retain(instance.image.name)
+        release(saved)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def image_deleted(sender, instance, **kwargs):
+    release(instance.image.name)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ArchivedComment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.parent_id is not None:
+        sender.objects.filter(pk=instance.parent_id).update(
+            replies_count=F('replies_count') - 1
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_revised(sender, instance, **kwargs):
+    if not hasattr(instance, '_saved_version'):
+        return
+    text, group_id = instance._saved_version
+    del instance._saved_version
+    if (text, group_id) != (instance.text, instance.group_id):
+        record_revision(instance, text, group_id)
@@ -0,0 +1,141 @@
+import heapq
+import json
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Follow, Post, User, UserSuggestions
+
+SUGGESTIONS_COUNT = 5
+SUGGESTIONS_BATCH_SIZE = 500
+SHARED_GROUP_WEIGHT = 0.5
+
+
+class FollowGraph:
+    """Разреженный граф подписок в виде списков смежности."""
+
+    def __init__(self, edges, author_groups):
+        self.following = defaultdict(set)
+        self.followers = defaultdict(set)
+        for user_id, author_id in edges:
+            self.following[user_id].add(author_id)
+            self.followers[author_id].add(user_id)
+        self.author_groups = defaultdict(set)
+        self.group_authors = defaultdict(set)
+        for author_id, group_id in author_groups:
+            self.author_groups[author_id].add(group_id)
+            self.group_authors[group_id].add(author_id)
+
+    @classmethod
+    def load(cls):
+        """Загружает весь граф двумя запросами."""
+        edges = Follow.objects.values_list('user_id', 'author_id')
+        author_groups = Post.objects.filter(
+            group__isnull=False
+        ).values_list('author_id', 'group_id').distinct()
+        return cls(edges.iterator(), author_groups.iterator())
+
+    @classmethod
+    def load_for_user(cls, user_id):
+        """Загружает только окрестность пользователя: подписки
+        и группы передаются в запросы подзапросами."""
+        followed = Follow.objects.filter(
+            user_id=user_id
+        ).values('author_id')
+        co_users = Follow.objects.filter(
+            author_id__in=followed
+        ).values('user_id')
+        edges = Follow.objects.filter(
+            Q(user_id__in=co_users) | Q(user_id=user_id)
+        ).values_list('user_id', 'author_id')
+        groups = Post.objects.filter(
+            author_id__in=followed,
+            group__isnull=False,
+        ).values('group_id')
+        author_groups = Post.objects.filter(
+            group_id__in=groups
+        ).values_list('author_id', 'group_id').distinct()
+        return cls(edges, author_groups)
+
+    def rank(self, user_id, count=SUGGESTIONS_COUNT):
+        """Возвращает id авторов с наибольшим числом общих подписок
+        и общих групп."""
+        followed = self.following.get(user_id, set())
+        scores = Counter()
+        for author_id in followed:
+            for co_user in self.followers[author_id]:
+                if co_user != user_id:
+                    scores.update(self.following[co_user])
+            for group_id in self.author_groups.get(author_id, ()):
+                for candidate in self.group_authors[group_id]:
+                    scores[candidate] += SHARED_GROUP_WEIGHT
+        for excluded in followed | {user_id}:
+            scores.pop(excluded, None)
+        best = heapq.nlargest(
+            count, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        return [author_id for author_id, _ in best]
+
+
+def build_suggestions(batch_size=SUGGESTIONS_BATCH_SIZE):
+    """Пересчитывает рекомендации для всех подписчиков пачками."""
+    graph = FollowGraph.load()
+    user_ids = sorted(graph.following)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            UserSuggestions.objects.filter(user_id__in=batch).delete()
+            UserSuggestions.objects.bulk_create(
+                UserSuggestions(
+                    user_id=uid, author_ids=json.dumps(graph.rank(uid))
+                )
+                for uid in batch
+            )
+    return len(user_ids)
+
+
+def refresh_stale_suggestions(batch_size=SUGGESTIONS_BATCH_SIZE):
+    """Пересчитывает устаревшие рекомендации по окрестностям
+    пользователей. Отметка снимается до пересчёта, поэтому подписка
+    во время него снова отметит рекомендации и они не потеряются."""
+    total = 0
+    while True:
+        user_ids = list(UserSuggestions.objects.filter(
+            stale=True
+        ).values_list('user_id', flat=True)[:batch_size])
+        if not user_ids:
+            return total
+        for user_id in user_ids:
+            UserSuggestions.objects.filter(
+                user_id=user_id
+            ).update(stale=False)
+            author_ids = FollowGraph.load_for_user(user_id).rank(user_id)
+            UserSuggestions.objects.filter(user_id=user_id).update(
+                author_ids=json.dumps(author_ids)
+            )
+        total += len(user_ids)
+
+
+def invalidate_suggestions(user_id):
+    """Отмечает рекомендации устаревшими: их пересчитает
+    build_suggestions --stale, а не сама подписка или отписка."""
+    UserSuggestions.objects.update_or_create(
+        user_id=user_id, defaults={'stale': True}
+    )
+
+
+def get_suggestions(user):
+    """Сохранённые рекомендации без пересчёта в запросе: до первого
+    пересчёта список пуст, а устаревший список показывается, пока
+    его не обновят. Авторы, на которых уже подписались, пропускаются."""
+    stored = UserSuggestions.objects.filter(
+        user=user
+    ).values_list('author_ids', flat=True).first()
+    author_ids = json.loads(stored) if stored else []
+    if not author_ids:
+        return []
+    authors = User.objects.filter(pk__in=author_ids).exclude(
+        following__user=user
+    ).in_bulk()
+    return [authors[pk] for pk in author_ids if pk in authors]
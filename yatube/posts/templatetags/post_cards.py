@@ -0,0 +1,100 @@
+from urllib.parse import quote
+
+from django import template
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from core.thumbnail import resolve_thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+URL_MARKER = '987654321'
+CARD_THUMBNAIL = '960x339'
+CARD_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+class UrlPattern:
+    """URL с одним аргументом: reverse выполняется один раз на страницу,
+    для каждой карточки остаётся только подстановка аргумента."""
+
+    def __init__(self, view_name):
+        self.prefix, self.suffix = reverse(
+            view_name, args=[URL_MARKER]
+        ).split(URL_MARKER)
+
+    def __call__(self, argument):
+        argument = quote(str(argument), safe=RFC3986_SUBDELIMS + '/~:@')
+        return f'{self.prefix}{argument}{self.suffix}'
+
+
+def card_image_urls(posts):
+    """Адреса картинок карточек {pk поста: url}: миниатюра,
+    а пока она в очереди, исходный файл."""
+    posts = [post for post in posts if post.image]
+    thumbnails = resolve_thumbnails(
+        [post.image for post in posts], CARD_THUMBNAIL,
+        **CARD_THUMBNAIL_OPTIONS,
+    )
+    urls = {}
+    for post in posts:
+        thumbnail = thumbnails.get(post.image.name)
+        urls[post.pk] = thumbnail.url if thumbnail else post.image.url
+    return urls
+
+
+class CardRenderer:
+    """Всё, что не зависит от поста: скомпилированный шаблон карточки,
+    префиксы URL и миниатюры всей страницы. Создаётся один раз
+    на рендеринг страницы.
+
+    Карточка не зависит от пользователя: ленты кешируются целиком,
+    поэтому кнопка подписки выводится скрытой, а состояние подписок
+    подставляет follow_buttons.js из некешируемого follow_state."""
+
+    def __init__(self, context):
+        self.card = context.template.engine.get_template(CARD_TEMPLATE)
+        self.post_url = UrlPattern('posts:post_detail')
+        self.profile_url = UrlPattern('posts:profile')
+        self.group_url = UrlPattern('posts:group_posts')
+        self.follow_url = UrlPattern('posts:profile_follow')
+        self.unfollow_url = UrlPattern('posts:profile_unfollow')
+        self.image_urls = card_image_urls(context.get('page_obj') or ())
+
+    def render(self, context, post, show_author_link, show_group_link,
+               show_follow_button):
+        forloop = context.get('forloop')
+        with context.push(
+            post=post,
+            show_author_link=show_author_link,
+            show_group_link=show_group_link,
+            post_url=self.post_url(post.pk),
+            author_url=self.profile_url(post.author.username),
+            group_url=self.group_url(post.group.slug) if post.group else '',
+            follow_url=(
+                self.follow_url(post.author.username)
+                if show_follow_button else None
+            ),
+            unfollow_url=(
+                self.unfollow_url(post.author.username)
+                if show_follow_button else None
+            ),
+            image_url=self.image_urls.get(post.pk),
+            is_last=forloop['last'] if forloop else True,
+        ):
+            return self.card.render(context)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, show_author_link=False, show_group_link=False,
+              show_follow_button=False):
+    """Карточка поста без накладных расходов {% include %}:
+    шаблон и URL готовятся один раз на страницу."""
+    renderer = context.render_context.get(CardRenderer)
+    if renderer is None:
+        renderer = context.render_context[CardRenderer] = CardRenderer(
+            context
+        )
+    return renderer.render(
+        context, post, show_author_link, show_group_link, show_follow_button
+    )
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..utils import EstimatedCountPaginator, analyze_table, estimate_count
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.user = User.objects.create_user(username='testuser')
+        cls.group = Group.objects.create(
+            title='Новая группа для тестов',
+            slug='test-group',
+            description='Тестовое описание'
+        )
+        Post.objects.bulk_create([
+            Post(text=f'{i}', author=cls.user, group=cls.group)
+            for i in range(3)
+        ])
+        cls.admin_post = Post.objects.create(text='Пост', author=cls.admin)
+        analyze_table(Post)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelist_query_count_does_not_grow(self):
+        """Список постов загружает автора и группу одним запросом."""
+        url = reverse('admin:posts_post_changelist')
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(
+            response,
+            f'<option value="{self.group.pk}" selected>{self.group}</option>'
+        )
+        Post.objects.bulk_create([
+            Post(text=f'{i}', author=self.user, group=self.group)
+            for i in range(5)
+        ])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_search_by_username(self):
+        """Поиск в админке находит посты по имени автора."""
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'admin'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.admin_post]
+        )
+
+    def test_paginator_estimates_unfiltered_count(self):
+        """Paginator оценивает размер таблицы без COUNT(*)."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertGreaterEqual(paginator.count, Post.objects.count())
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(author=self.admin), 10
+        )
+        self.assertEqual(filtered.count, 1)
+
+    def test_estimate_ignores_deleted_rows(self):
+        """Оценка берётся из статистики таблицы, а не из MAX(rowid):
+        удалённые посты в неё не попадают."""
+        Post.objects.bulk_create(
+            Post(text='Удалённый', author=self.admin) for _ in range(20)
+        )
+        Post.objects.filter(text='Удалённый').delete()
+        self.assertEqual(estimate_count(Post), Post.objects.count())
+
+    def test_exact_count_without_table_stats(self):
+        """Без статистики таблицы считается точное число постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM sqlite_stat1 WHERE tbl = %s',
+                [Post._meta.db_table]
+            )
+        self.assertIsNone(estimate_count(Post))
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 10).count,
+            Post.objects.count(),
+        )
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import QuerySetChain, archive_chunk
+from ..models import ArchivedComment, ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+        old_posts = [
+            Post.objects.create(text=f'Старый пост {i}', author=cls.user)
+            for i in range(3)
+        ]
+        Post.objects.filter(pk__in=[post.pk for post in old_posts]).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        cls.old_post = old_posts[0]
+        cls.comment = Comment.objects.create(
+            post=cls.old_post, author=cls.user, text='Комментарий'
+        )
+        cls.new_post = Post.objects.create(text='Новый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_command_moves_old_posts_in_chunks(self):
+        """Старые посты и их комментарии переносятся в архив пачками."""
+        call_command('archive_posts', days=365, chunk_size=2)
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertEqual(
+            ArchivedComment.objects.get(pk=self.comment.pk).post_id,
+            self.old_post.pk
+        )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_chunk_is_resumable(self):
+        """Повторный запуск продолжает перенос с оставшихся постов."""
+        cutoff = timezone.now() - timedelta(days=365)
+        self.assertEqual(archive_chunk(cutoff, 2), 2)
+        self.assertEqual(archive_chunk(cutoff, 2), 1)
+        self.assertEqual(archive_chunk(cutoff, 2), 0)
+
+    def test_edited_posts_keep_history(self):
+        """Отредактированный пост не переносится в архив вместе
+        с потерей истории правок."""
+        post = Post.objects.get(pk=self.old_post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        call_command('archive_posts', days=365)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+        self.assertFalse(ArchivedPost.objects.filter(pk=post.pk).exists())
+        self.assertEqual(post.revisions.count(), 2)
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+
+    def test_archived_post_detail(self):
+        """Страница архивного поста открывается с комментариями."""
+        call_command('archive_posts', days=365)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old_post.pk})
+        )
+        self.assertEqual(response.context['post'].text, self.old_post.text)
+        self.assertEqual(
+            response.context['comments'][0].text, self.comment.text
+        )
+
+    def test_profile_includes_archived_posts(self):
+        """Профиль показывает сначала новые, затем архивные посты."""
+        call_command('archive_posts', days=365)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, 4)
+        self.assertEqual(page[0].pk, self.new_post.pk)
+        self.assertTrue(page[1].is_archived)
+
+    def test_chain_slices_across_querysets(self):
+        """Срез цепочки выборок проходит через границу таблиц."""
+        call_command('archive_posts', days=365)
+        chain = QuerySetChain(
+            Post.objects.all(), ArchivedPost.objects.order_by('pk')
+        )
+        self.assertEqual(
+            [post.pk for post in chain[0:3]],
+            [self.new_post.pk, self.old_post.pk, self.old_post.pk + 1]
+        )
@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..feeds import feed_pages, followed_feed, followed_sources
+from ..live import Subscription
+from ..models import Follow, Group, GroupFollow, Post
+from ..utils import POSTS_ON_PAGE
+
+User = get_user_model()
+
+SOURCES_COUNT = 20
+
+
+class FollowedFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.now = timezone.now()
+        cls.in_group = cls.create_post('Автора в группе', cls.author, 1)
+        cls.by_author = cls.create_post('Автора', cls.author, 2, group=None)
+        cls.by_other = cls.create_post('Чужой в группе', cls.other, 3)
+        cls.create_post('Чужой', cls.other, 4, group=None)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+
+    @classmethod
+    def create_post(cls, text, author, days, group=True):
+        post = Post.objects.create(
+            text=text, author=author,
+            group=cls.group if group else None,
+        )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=cls.now - timedelta(days=days)
+        )
+        return post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_merges_authors_and_groups(self):
+        """Лента подписок сливает авторов и группы по дате без повторов."""
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.in_group.pk, self.by_author.pk, self.by_other.pk],
+        )
+        self.assertIsNone(response.context['next_page_url'])
+
+    def test_feed_continues_by_cursor(self):
+        """Страницы по курсору идут подряд без пропусков и повторов."""
+        expected = [self.in_group.pk, self.by_author.pk, self.by_other.pk]
+        for day in range(5, 5 + POSTS_ON_PAGE):
+            expected.append(self.create_post(
+                f'Пост {day}', self.other, day
+            ).pk)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        pks = [post.pk for post in response.context['page_obj']]
+        response = self.authorized_client.get(
+            reverse('posts:follow_index')
+            + response.context['next_page_url']
+        )
+        pks += [post.pk for post in response.context['page_obj']]
+        self.assertEqual(pks, expected)
+
+    def test_bad_cursor(self):
+        """Испорченный курсор даёт 400, а не ошибку сервера."""
+        response = self.authorized_client.get(
+            reverse('posts:follow_index'), {'cursor': 'мусор'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_first_page_reads_few_rows_per_source(self):
+        """Для первой страницы из каждого источника читается
+        первая небольшая порция ключей, а не все его посты."""
+        for number in range(SOURCES_COUNT):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=self.reader, author=author)
+            for i in range(10):
+                post = Post.objects.create(text=f'Пост {i}', author=author)
+                Post.objects.filter(pk=post.pk).update(
+                    pub_date=self.now - timedelta(
+                        minutes=i * SOURCES_COUNT + number
+                    )
+                )
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        with CaptureQueriesContext(connection) as queries:
+            posts, cursor = followed_feed(
+                self.reader, request, POSTS_ON_PAGE
+            )
+        self.assertEqual(len(posts), POSTS_ON_PAGE)
+        self.assertIsNotNone(cursor)
+        sources = len(followed_sources(self.reader))
+        self.assertLessEqual(len(queries), sources + 3)
+
+    def test_merge_skips_duplicates(self):
+        """Пост из нескольких источников попадает на страницу один раз."""
+        request = RequestFactory().get('/')
+        pks, _ = feed_pages.merge(
+            [Post.objects.all()] * 3, request, limit=POSTS_ON_PAGE
+        )
+        self.assertEqual(pks, list(
+            Post.objects.order_by('-pub_date').values_list('pk', flat=True)
+        ))
+
+    def test_group_follow_and_unfollow(self):
+        """Подписка на группу и отписка с её страницы."""
+        other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        url = reverse('posts:group_posts', args=['other'])
+        self.authorized_client.get(
+            reverse('posts:group_follow', args=['other'])
+        )
+        self.assertTrue(GroupFollow.objects.filter(
+            user=self.reader, group=other_group
+        ).exists())
+        response = self.authorized_client.get(url)
+        self.assertTrue(response.context['group_following'])
+        self.authorized_client.get(
+            reverse('posts:group_unfollow', args=['other'])
+        )
+        self.assertFalse(GroupFollow.objects.filter(
+            user=self.reader, group=other_group
+        ).exists())
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['group_following'])
+
+    def test_group_follow_requires_login(self):
+        """Аноним отправляется на страницу входа."""
+        response = self.client.get(
+            reverse('posts:group_follow', args=['group'])
+        )
+        self.assertRedirects(
+            response,
+            reverse('users:login') + '?next='
+            + reverse('posts:group_follow', args=['group']),
+        )
+
+    def test_stream_includes_followed_groups(self):
+        """Поток подписок пропускает посты групп подписок."""
+        subscription = Subscription(
+            author_ids={self.author.pk}, group_ids={self.group.pk}
+        )
+        self.assertTrue(subscription.matches(
+            {'author_id': self.other.pk, 'group_id': self.group.pk}
+        ))
+        self.assertFalse(subscription.matches(
+            {'author_id': self.other.pk, 'group_id': None}
+        ))
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -59,6 +60,7 @@ class FormModelTest(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
         form_data = {
             'text': 'Новый текст для добавления поста',
             'group': self.group.id,
@@ -78,7 +80,7 @@ class FormModelTest(TestCase):
             Post.objects.filter(
                 text=form_data['text'],
                 group=self.group.id,
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
 
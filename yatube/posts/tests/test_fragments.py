@@ -0,0 +1,141 @@
+import base64
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Follow, Group, Post
+from ..utils import POSTS_ON_PAGE
+
+User = get_user_model()
+
+POSTS_COUNT = POSTS_ON_PAGE * 2 + 3
+MALFORMED_CURSORS = [
+    base64.urlsafe_b64encode(raw.encode()).decode()
+    for raw in (
+        '5', '[]', '[5]', '["2020-01-01T00:00:00"]',
+        '["2020-13-45T00:00:00", 1]', '["2020-01-01T00:00:00", "abc"]',
+    )
+]
+
+
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        now = timezone.now()
+        cls.texts = []
+        for i in range(POSTS_COUNT):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(days=i)
+            )
+            cls.texts.append(post.text)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def collect(self, client, url):
+        """Проходит ленту фрагментами, возвращает тексты постов."""
+        texts = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            texts.extend(
+                post.text for post in response.context['page_obj']
+            )
+            url = response.context['next_fragment_url']
+        return texts
+
+    def test_fragments_contain_only_cards(self):
+        """Фрагмент отдаёт карточки и курсор без общего макета."""
+        response = self.client.get(reverse('posts:index_fragment'))
+        content = response.content.decode()
+        self.assertNotIn('<html', content)
+        self.assertNotIn('<header', content)
+        self.assertEqual(content.count('<article>'), POSTS_ON_PAGE)
+        self.assertIn(response['X-Next-Cursor'], content)
+
+    def test_fragments_continue_pages(self):
+        """Фрагменты продолжают ленту без пропусков и повторов."""
+        urls = {
+            reverse('posts:index_fragment'): self.client,
+            reverse('posts:group_fragment', args=['group']): self.client,
+            reverse('posts:profile_fragment', args=['author']): self.client,
+            reverse('posts:follow_fragment'): self.authorized_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.collect(client, url), self.texts)
+
+    def test_full_page_links_to_fragment(self):
+        """Страница ссылается на фрагмент, начинающийся после неё."""
+        response = self.client.get(reverse('posts:index'))
+        next_url = response.context['next_fragment_url']
+        self.assertContains(response, f'data-next-url="{next_url}"')
+        self.assertEqual(
+            self.collect(self.client, next_url),
+            self.texts[POSTS_ON_PAGE:]
+        )
+        response = self.client.get(reverse('posts:index') + '?page=3')
+        self.assertIsNone(response.context['next_fragment_url'])
+
+    def test_profile_fragment_merges_archive(self):
+        """Фрагменты профиля сливают оперативные посты с архивом."""
+        call_command('archive_posts', days=POSTS_ON_PAGE)
+        self.assertTrue(self.author.archived_posts.exists())
+        url = reverse('posts:profile_fragment', args=['author'])
+        self.assertEqual(self.collect(self.client, url), self.texts)
+
+    def test_fragment_etag(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        url = reverse('posts:group_fragment', args=['group'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_fragment_bad_cursor(self):
+        """Некорректный курсор отклоняется с кодом 400."""
+        response = self.client.get(
+            reverse('posts:index_fragment') + '?cursor=%%%'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_fragment_malformed_cursor(self):
+        """Курсор, который декодируется, но имеет неверную форму,
+        тоже отклоняется с кодом 400."""
+        pages = [
+            reverse('posts:index_fragment'),
+            reverse('posts:group_fragment', args=[self.group.slug]),
+            reverse('posts:profile_fragment', args=[self.author.username]),
+            reverse('posts:follow_fragment'),
+            reverse('posts:follow_index'),
+        ]
+        for url in pages:
+            for cursor in MALFORMED_CURSORS:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.authorized_client.get(
+                        url, {'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, 400)
+
+    def test_follow_fragment_requires_login(self):
+        """Фрагмент подписок недоступен анониму."""
+        response = self.client.get(reverse('posts:follow_fragment'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,132 @@
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+CSRF_VALUE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]+')
+
+
+def normalize(html):
+    """Убирает различия, не влияющие на разметку: пробелы и csrf-токен."""
+    html = CSRF_VALUE.sub(r'\1', html)
+    html = re.sub(r'\s+', ' ', html)
+    return re.sub(r'\s*(<|>)\s*', r'\1', html).strip()
+
+
+def jinja2_first():
+    by_name = {engine['NAME']: engine for engine in settings.TEMPLATES}
+    return [by_name['jinja2'], by_name['django']]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class Jinja2ParityTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', first_name='Читатель "О\'Брайен"'
+        )
+        cls.author = User.objects.create_user(
+            username='author', first_name='Автор', last_name='<Текстов>'
+        )
+        cls.group = Group.objects.create(
+            title='Группа & друзья',
+            slug='test-group',
+            description='Описание <b>группы</b>',
+        )
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='Первая строка\nвторая "строка" & <script>',
+            author=cls.author,
+            group=cls.group,
+            image=SimpleUploadedFile('small.gif', small_gif, 'image/gif'),
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {index}', author=cls.user, group=cls.group)
+            for index in range(12)
+        )
+        Post.objects.create(text='Длинный пост\n' * 50, author=cls.author)
+        parent = Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий <i>'
+        )
+        cls.comment = parent
+        for depth in range(4):
+            parent = Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Ответ {depth}',
+                parent=parent,
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def render_both(self, client, url):
+        cache.clear()
+        django_html = client.get(url).content.decode()
+        cache.clear()
+        with override_settings(TEMPLATES=jinja2_first()):
+            response = client.get(url)
+        names = [template.name for template in response.templates]
+        self.assertNotIn('base.html', names)
+        self.assertNotIn('posts/includes/post_card.html', names)
+        jinja2_html = response.content.decode()
+        return normalize(django_html), normalize(jinja2_html)
+
+    def test_pages_render_identically(self):
+        """Jinja2 и Django выдают одинаковый HTML на страницах постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:post_detail', args=(self.post.pk,))
+            + f'?reply_to={self.comment.pk}',
+            reverse('posts:follow_index'),
+            reverse('posts:index_fragment'),
+            reverse('posts:profile_fragment', args=(self.author.username,)),
+        )
+        for client in (Client(), self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url, user=client.session.get(
+                    '_auth_user_id'
+                )):
+                    django_html, jinja2_html = self.render_both(client, url)
+                    self.assertEqual(jinja2_html, django_html)
+
+    def test_history_renders_identically(self):
+        """История правок совпадает в обоих движках."""
+        self.post.text += '\nдобавлено <b>при правке</b>'
+        self.post.save()
+        client = Client()
+        client.force_login(self.author)
+        django_html, jinja2_html = self.render_both(
+            client, reverse('posts:post_history', args=(self.post.pk,))
+        )
+        self.assertIn('<ins>', jinja2_html)
+        self.assertEqual(jinja2_html, django_html)
@@ -0,0 +1,111 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..live import LiveFeed, Subscription, live_feed
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+def read_event(response):
+    """Следующее событие потока, пропуская служебные строки."""
+    while True:
+        chunk = next(response.streaming_content).decode()
+        if chunk.startswith('id: '):
+            fields = dict(
+                line.split(': ', 1) for line in chunk.strip().split('\n')
+            )
+            fields['data'] = json.loads(fields['data'])
+            return fields
+
+
+@override_settings(LIVE_FEED_POLL_INTERVAL=0)
+class LiveFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.old_post = Post.objects.create(text='Старый', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_single_poll_fans_out(self):
+        """Один запрос за опрос раздаёт изменения всем подписчикам."""
+        feed = LiveFeed()
+        everything = Subscription()
+        group_only = Subscription(group_id=self.group.pk)
+        followed = Subscription(author_ids={self.author.pk})
+        for subscription in (everything, group_only, followed):
+            feed.subscribe(subscription)
+        in_group = Post.objects.create(
+            text='В группе', author=self.other, group=self.group
+        )
+        by_author = Post.objects.create(text='Автора', author=self.author)
+        with self.assertNumQueries(1):
+            self.assertEqual(feed.poll(), 2)
+        self.assertEqual(everything.get(0), [in_group.pk, by_author.pk])
+        self.assertEqual(group_only.get(0), [in_group.pk])
+        self.assertEqual(followed.get(0), [by_author.pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(feed.poll(), 0)
+
+    def test_subscribe_replays_since_id(self):
+        """Переподключение с Last-Event-ID досылает пропущенные посты."""
+        missed = Post.objects.create(text='Пропущенный', author=self.author)
+        subscription = Subscription()
+        LiveFeed().subscribe(subscription, since_id=self.old_post.pk)
+        self.assertEqual(subscription.get(0), [missed.pk])
+
+    def test_stream_pushes_new_posts(self):
+        """Поток сообщает о новых постах и по запросу отдаёт карточки."""
+        response = self.client.get(reverse('posts:index_stream') + '?cards')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(
+            next(response.streaming_content).startswith(b'retry:')
+        )
+        post = Post.objects.create(text='Свежий пост', author=self.other)
+        event = read_event(response)
+        self.assertEqual(event['event'], 'posts')
+        self.assertEqual(event['id'], str(post.pk))
+        self.assertEqual(event['data']['count'], 1)
+        self.assertIn('Свежий пост', event['data']['html'])
+        response.close()
+        self.assertFalse(live_feed.subscriptions)
+
+    def test_follow_stream_filters_authors(self):
+        """Поток подписок пропускает посты чужих авторов."""
+        response = self.authorized_client.get(reverse('posts:follow_stream'))
+        next(response.streaming_content)
+        Post.objects.create(text='Чужой', author=self.other)
+        post = Post.objects.create(text='Свой', author=self.author)
+        self.assertEqual(read_event(response)['data']['ids'], [post.pk])
+        response.close()
+
+    def test_pages_link_to_stream(self):
+        """Ленты подключают поток новых постов."""
+        response = self.client.get(
+            reverse('posts:group_posts', args=['group'])
+        )
+        self.assertContains(
+            response,
+            'data-stream-url="{}"'.format(
+                reverse('posts:group_stream', args=['group'])
+            )
+        )
+
+    def test_follow_stream_requires_login(self):
+        """Поток подписок недоступен анониму."""
+        response = self.client.get(reverse('posts:follow_stream'))
+        self.assertEqual(response.status_code, 302)
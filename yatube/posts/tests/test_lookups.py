@@ -0,0 +1,73 @@
+import multiprocessing
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.http import Http404
+from django.test import TestCase
+
+from ..lookups import LRUCache, get_author, get_group, group_cache
+from ..models import Group
+
+User = get_user_model()
+
+
+class LookupCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+        cls.group = Group.objects.create(
+            title='Новая группа для тестов',
+            slug='test-group',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+
+    def test_repeated_lookup_hits_local_cache(self):
+        """Повторный поиск группы и автора не обращается к базе."""
+        self.assertEqual(get_group('test-group'), self.group)
+        self.assertEqual(get_author('testuser'), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group('test-group'), self.group)
+            self.assertEqual(get_author('testuser'), self.user)
+
+    def test_rename_invalidates_entries(self):
+        """Переименованная группа не отдаётся из кеша по старому slug."""
+        get_group('test-group')
+        self.group.slug = 'renamed'
+        self.group.save()
+        with self.assertRaises(Http404):
+            get_group('test-group')
+        self.assertEqual(get_group('renamed'), self.group)
+
+    def test_shared_version_change_invalidates_entries(self):
+        """Изменение версии в общем кеше другим процессом
+        сбрасывает локальные записи."""
+        get_group('test-group')
+        caches['shared'].delete(group_cache.version_key)
+        with self.assertNumQueries(1):
+            get_group('test-group')
+
+    def test_change_in_other_process_invalidates_entries(self):
+        """Версия, сменённая в другом процессе, видна в этом."""
+        get_group('test-group')
+        Group.objects.filter(pk=self.group.pk).update(title='Новое название')
+        process = multiprocessing.get_context('fork').Process(
+            target=group_cache.bump_version
+        )
+        process.start()
+        process.join()
+        self.assertEqual(get_group('test-group').title, 'Новое название')
+
+    def test_lru_eviction_and_stats(self):
+        """Кеш вытесняет давние записи и считает попадания."""
+        lru = LRUCache('lookup_version:test', maxsize=2)
+        for key in ('a', 'b', 'a', 'c', 'b'):
+            lru.get(key, lambda: key.upper())
+        self.assertEqual(
+            lru.stats(),
+            {'hits': 1, 'misses': 4, 'hit_rate': 0.2, 'size': 2}
+        )
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import TITLE_LENGTH, Post
+
+User = get_user_model()
+
+LONG_TEXT = 'Длинная <строка> текста\n' * 40
+
+
+class RenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+        cls.short_post = Post.objects.create(
+            text='Короткий\n<текст>', author=cls.user
+        )
+        cls.long_post = Post.objects.create(text=LONG_TEXT, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_html_is_rendered_on_save(self):
+        """При сохранении текст экранируется и переводится в HTML."""
+        self.assertEqual(
+            self.short_post.text_html, 'Короткий<br>&lt;текст&gt;'
+        )
+        self.assertEqual(self.short_post.excerpt, '')
+        self.assertFalse(self.short_post.is_truncated)
+        self.assertTrue(self.long_post.is_truncated)
+        self.assertLess(len(self.long_post.excerpt), len(LONG_TEXT))
+        self.assertTrue(self.long_post.excerpt.endswith('…'))
+
+    def test_update_fields_with_text_rerenders(self):
+        """save(update_fields=['text']) обновляет и HTML."""
+        self.short_post.text = 'Новый текст'
+        self.short_post.save(update_fields=['text'])
+        self.short_post.refresh_from_db()
+        self.assertEqual(self.short_post.text_html, 'Новый текст')
+
+    def test_command_backfills_empty_posts(self):
+        """Команда заполняет HTML у постов, сохранённых без него."""
+        Post.objects.update(text_html='', excerpt='')
+        call_command('render_posts', chunk_size=1, stdout=StringIO())
+        long_post = Post.objects.get(pk=self.long_post.pk)
+        self.assertEqual(long_post.text_html, self.long_post.text_html)
+        self.assertEqual(long_post.excerpt, self.long_post.excerpt)
+
+    def test_feed_shows_excerpt(self):
+        """В ленте длинный пост показан анонсом со ссылкой на продолжение."""
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        self.assertIn(self.long_post.excerpt, content)
+        self.assertNotIn(self.long_post.text_html, content)
+        self.assertContains(response, 'читать дальше', count=1)
+
+    def test_unrendered_post_falls_back_to_text(self):
+        """До заполнения HTML пост рендерится из исходного текста."""
+        post = Post(text=LONG_TEXT, author=self.user)
+        self.assertEqual(post.body_html, self.long_post.text_html)
+        self.assertEqual(post.excerpt_html, self.long_post.excerpt)
+        self.assertTrue(post.is_truncated)
+        self.assertEqual(post.title, self.long_post.title)
+        self.assertEqual(len(post.title), TITLE_LENGTH)
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+from ..revisions import (
+    SNAPSHOT_INTERVAL, apply_delta, make_delta, revision_texts
+)
+
+User = get_user_model()
+
+BASE_TEXT = 'Первая строка поста.\nВторая строка, довольно длинная. ' * 5
+
+
+class PostRevisionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        self.post = Post.objects.create(text=BASE_TEXT, author=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def edit(self, count):
+        versions = [self.post.text]
+        for index in range(count):
+            self.post.text = self.post.text.replace(
+                'строка', f'строка {index}', 1
+            )
+            self.post.save()
+            versions.append(self.post.text)
+        return versions
+
+    def test_delta_roundtrip(self):
+        """Дельта восстанавливает новый текст из старого."""
+        old = 'Мама мыла раму.\nПапа читал газету.'
+        new = 'Мама мыла окно.\nПапа читал свежую газету!'
+        self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+    def test_edits_are_stored_as_deltas(self):
+        """Правки хранятся дельтами со снимками через интервал."""
+        versions = self.edit(SNAPSHOT_INTERVAL + 2)
+        revisions = list(self.post.revisions.order_by('number'))
+        self.assertEqual(len(revisions), len(versions))
+        snapshots = [
+            revision.number for revision in revisions if revision.is_snapshot
+        ]
+        self.assertEqual(snapshots, [1, SNAPSHOT_INTERVAL + 1])
+        self.assertLess(len(revisions[1].data), len(BASE_TEXT) / 5)
+        for number, text in enumerate(versions, start=1):
+            with self.assertNumQueries(1):
+                previous, restored = revision_texts(self.post.pk, number)
+            self.assertEqual(restored, text)
+            if number > 1:
+                self.assertEqual(previous, versions[number - 2])
+
+    def test_group_change_is_a_revision(self):
+        """Смена группы тоже создаёт редакцию, сохранение без правок — нет."""
+        self.post.save()
+        self.post.group = self.group
+        self.post.save()
+        self.assertEqual(
+            list(self.post.revisions.values_list('number', 'group')),
+            [(2, self.group.pk), (1, None)]
+        )
+
+    def test_new_post_has_no_history(self):
+        """Новый пост не дублирует текст в истории: первой редакцией
+        при первой правке становится старый текст с датой публикации."""
+        self.assertFalse(self.post.revisions.exists())
+        self.edit(1)
+        _, first = revision_texts(self.post.pk, 1)
+        self.assertEqual(first, BASE_TEXT)
+        self.assertEqual(
+            self.post.revisions.get(number=1).created, self.post.pub_date
+        )
+
+    def test_compact_command(self):
+        """Старые редакции схлопываются, новые восстанавливаются."""
+        versions = self.edit(5)
+        self.post.revisions.filter(number__lte=4).update(
+            created=timezone.now() - timedelta(days=100)
+        )
+        call_command('compact_revisions', days=90, stdout=StringIO())
+        self.assertEqual(
+            list(self.post.revisions.values_list('number', 'is_snapshot')),
+            [(6, False), (5, False), (4, True)]
+        )
+        for number in (4, 5, 6):
+            self.assertEqual(
+                revision_texts(self.post.pk, number)[1], versions[number - 1]
+            )
+
+    def test_history_view(self):
+        """Автор видит правки редакции, остальные — нет."""
+        self.edit(1)
+        url = reverse('posts:post_history', args=[self.post.pk])
+        response = self.client.get(url + '?revision=2')
+        self.assertContains(response, 'строка<ins> 0</ins>')
+        self.assertEqual(len(response.context['revisions']), 2)
+        response = self.client.get(url + '?revision=9')
+        self.assertEqual(response.status_code, 404)
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        self.assertRedirects(
+            other.get(url),
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
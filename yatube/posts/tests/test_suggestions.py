@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, UserSuggestions
+from ..suggestions import FollowGraph, get_suggestions
+
+User = get_user_model()
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.neighbour = User.objects.create_user(username='neighbour')
+        cls.author = User.objects.create_user(username='author')
+        cls.popular = User.objects.create_user(username='popular')
+        cls.group_mate = User.objects.create_user(username='group_mate')
+        cls.group = Group.objects.create(
+            title='Новая группа для тестов',
+            slug='test-group',
+            description='Тестовое описание'
+        )
+        Post.objects.create(text='Пост', author=cls.author, group=cls.group)
+        Post.objects.create(
+            text='Пост', author=cls.group_mate, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.neighbour, author=cls.author)
+        Follow.objects.create(user=cls.neighbour, author=cls.popular)
+
+    def setUp(self):
+        call_command('build_suggestions', stdout=StringIO())
+
+    def test_rank_by_co_follow_and_shared_group(self):
+        """Рекомендации учитывают общие подписки и общие группы."""
+        graph = FollowGraph.load()
+        self.assertEqual(
+            graph.rank(self.reader.pk),
+            [self.popular.pk, self.group_mate.pk]
+        )
+
+    def test_neighbourhood_matches_full_graph(self):
+        """Окрестность пользователя даёт тот же результат,
+        что и полный граф."""
+        self.assertEqual(
+            FollowGraph.load_for_user(self.reader.pk).rank(self.reader.pk),
+            FollowGraph.load().rank(self.reader.pk),
+        )
+
+    def test_build_command_stores_suggestions(self):
+        """Команда build_suggestions сохраняет рекомендации в таблицу."""
+        UserSuggestions.objects.all().delete()
+        call_command('build_suggestions', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            get_suggestions(self.reader), [self.popular, self.group_mate]
+        )
+
+    def test_missing_suggestions_are_not_computed(self):
+        """Без сохранённых рекомендаций список пуст и граф подписок
+        в запросе не загружается."""
+        UserSuggestions.objects.all().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_suggestions(self.reader), [])
+
+    def test_follow_hides_followed_author(self):
+        """Новая подписка сразу убирает автора из рекомендаций."""
+        self.assertIn(self.popular, get_suggestions(self.reader))
+        Follow.objects.create(user=self.reader, author=self.popular)
+        self.assertNotIn(self.popular, get_suggestions(self.reader))
+
+    def test_follow_marks_suggestions_stale(self):
+        """Подписка только отмечает рекомендации устаревшими,
+        а команда с --stale пересчитывает их."""
+        Follow.objects.create(user=self.reader, author=self.popular)
+        stored = UserSuggestions.objects.get(user=self.reader)
+        self.assertTrue(stored.stale)
+        self.assertIn(str(self.popular.pk), stored.author_ids)
+        call_command('build_suggestions', stale=True, stdout=StringIO())
+        stored.refresh_from_db()
+        self.assertFalse(stored.stale)
+        self.assertEqual(get_suggestions(self.reader), [self.group_mate])
+
+    def test_follow_index_shows_suggestions(self):
+        """На странице подписок выводятся рекомендации."""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'], [self.popular, self.group_mate]
+        )
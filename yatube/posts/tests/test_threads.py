@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import MAX_COMMENT_DEPTH, Comment, Post
+from ..threads import DISPLAY_DEPTH, thread_page
+
+User = get_user_model()
+
+
+class CommentThreadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testuser')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.other_post = Post.objects.create(text='Другой', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def comment(self, text, parent=None, post=None):
+        return Comment.objects.create(
+            post=post or self.post, author=self.user, text=text,
+            parent=parent,
+        )
+
+    def chain(self, length, parent=None):
+        comments = []
+        for level in range(length):
+            parent = self.comment(f'Уровень {level}', parent)
+            comments.append(parent)
+        return comments
+
+    def test_thread_order(self):
+        """Новые ветки первыми, ответы под родителем по порядку."""
+        first = self.comment('Первый')
+        second = self.comment('Второй')
+        reply = self.comment('Ответ', first)
+        nested = self.comment('Ответ на ответ', reply)
+        later_reply = self.comment('Ещё ответ', first)
+        self.assertEqual(
+            list(self.post.comments.all()),
+            [second, first, reply, nested, later_reply]
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.replies_count, 2)
+        self.assertEqual(nested.depth, 2)
+
+    def test_depth_is_limited(self):
+        """Ответ глубже предела становится соседом родителя."""
+        comments = self.chain(MAX_COMMENT_DEPTH + 1)
+        deepest = comments[-1]
+        self.assertEqual(deepest.depth, MAX_COMMENT_DEPTH)
+        reply = self.comment('Слишком глубоко', deepest)
+        self.assertEqual(reply.depth, MAX_COMMENT_DEPTH)
+        self.assertEqual(reply.parent, comments[-2])
+
+    def test_subtree_in_one_query(self):
+        """Поддерево читается одним запросом до заданной глубины."""
+        root = self.comment('Корень')
+        sibling = self.comment('Соседняя ветка')
+        self.comment('Ответ соседу', sibling)
+        chain = self.chain(DISPLAY_DEPTH + 1, root)
+        root.refresh_from_db()
+        with self.assertNumQueries(1):
+            comments, after = thread_page(self.post.comments.all(), root)
+        self.assertEqual(comments, chain[:DISPLAY_DEPTH])
+        self.assertIsNone(after)
+        self.assertTrue(comments[-1].collapsed)
+
+    def test_thread_pages_continue(self):
+        """Страницы ветки продолжаются с последнего пути."""
+        comments = [self.comment(f'Комментарий {i}') for i in range(5)]
+        page, after = thread_page(self.post.comments.all(), limit=3)
+        rest, last = thread_page(
+            self.post.comments.all(), after=after, limit=3
+        )
+        self.assertEqual(page + rest, comments[::-1])
+        self.assertIsNone(last)
+
+    def test_reply_through_form(self):
+        """Ответ сохраняется в ветке; чужой пост как родитель отклоняется."""
+        parent = self.comment('Вопрос')
+        foreign = self.comment('Чужой', post=self.other_post)
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        self.authorized_client.post(
+            url, {'text': 'Ответ', 'parent': parent.pk}
+        )
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, parent)
+        self.assertTrue(reply.path.startswith(parent.path))
+        response = self.authorized_client.post(
+            url, {'text': 'Не туда', 'parent': foreign.pk}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.filter(text='Не туда').exists())
+
+    def test_replies_fragment(self):
+        """Ответы свёрнутого комментария отдаются фрагментом."""
+        chain = self.chain(DISPLAY_DEPTH + 2)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        collapsed = chain[DISPLAY_DEPTH - 1]
+        url = reverse(
+            'posts:comment_thread', args=[self.post.pk, collapsed.pk]
+        )
+        self.assertContains(response, f'href="{url}"')
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, '<html')
+        self.assertEqual(
+            list(response.context['comments']), chain[DISPLAY_DEPTH:]
+        )
+        response = self.authorized_client.get(url + '?after=%27')
+        self.assertEqual(response.status_code, 400)
@@ -162,6 +162,22 @@ class PostPagesTest(TestCase):
                     response.context['page_obj'][0].text, self.post.text
                 )
 
+    def test_post_cards_links(self):
+        """Карточки постов содержат ссылки на пост, автора и группу."""
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:index'))
+        for url in (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:profile', kwargs={'username': self.post.author}),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.post.author}
+            ),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(response, f'href="{url}"')
+
     def test_cache_in_index(self):
         """Шаблон index хранится в кеше"""
         self.post_test_cache = Post.objects.create(
@@ -426,3 +442,77 @@ class FollowViewTests(TestCase):
             response.context.get('page_obj')[0].text,
             self.post.text
         )
+
+    def test_cached_feeds_do_not_leak_follow_state(self):
+        """Кешированные ленты одинаковы для всех: подписки первого
+        посетителя не попадают в страницу второго."""
+        other = User.objects.create_user(username='other')
+        other_client = Client()
+        other_client.force_login(other)
+        Follow.objects.create(user=self.follower, author=self.user)
+        unfollow_url = reverse(
+            'posts:profile_unfollow', kwargs={'username': self.user}
+        )
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:index_fragment'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:group_fragment', kwargs={'slug': self.group.slug}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                cache.clear()
+                first = self.authorized_client.get(page)
+                second = other_client.get(page)
+                self.assertNotContains(first, 'Отписаться')
+                self.assertNotContains(second, 'Отписаться')
+                self.assertContains(
+                    second, f'data-unfollow-url="{unfollow_url}"'
+                )
+                self.assertContains(
+                    second, f'data-author-id="{self.user.pk}"'
+                )
+
+    def test_follow_buttons_script_included_once(self):
+        """Скрипт кнопок подписки подключается на ленте один раз."""
+        for page in (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+        ):
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                self.assertEqual(
+                    response.content.decode().count('js/follow_buttons.js'), 1
+                )
+
+    def test_follow_state(self):
+        """follow_state отдаёт подписки пользователя среди запрошенных
+        авторов и не кешируется."""
+        url = reverse('posts:follow_state')
+        authors = f'?authors={self.user.pk},{self.user_no_follow.pk},x'
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user})
+        )
+        response = self.authorized_client.get(url + authors)
+        self.assertEqual(response.json(), {
+            'user': self.follower.pk, 'following': [self.user.pk]
+        })
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.user})
+        )
+        response = self.authorized_client.get(url + authors)
+        self.assertEqual(response.json()['following'], [])
+        response = self.guest_client.get(url + authors)
+        self.assertEqual(response.json(), {'user': None, 'following': []})
+
+    def test_follow_buttons_do_not_query_per_post(self):
+        """Кнопки подписки на карточках не делают запрос на каждый пост."""
+        url = reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        self.authorized_client.get(url)
+        Post.objects.bulk_create([
+            Post(text=f'{i}', author=self.user, group=self.group)
+            for i in range(5)
+        ])
+        with self.assertNumQueries(2):
+            self.authorized_client.get(url)
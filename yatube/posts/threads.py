@@ -0,0 +1,47 @@
+import re
+
+from django.core.exceptions import ValidationError
+
+from .models import PATH_END
+
+COMMENTS_ON_PAGE = 50
+DISPLAY_DEPTH = 3
+PATH_PATTERN = re.compile(r'^[0-9a-z]+$')
+
+
+def thread_page(comments, root=None, after=None, depth=DISPLAY_DEPTH,
+                limit=COMMENTS_ON_PAGE):
+    """Страница ветки в порядке path: вся ветка поста или поддерево
+    root, не глубже depth уровней, начиная после пути after.
+    Возвращает (комментарии, путь для следующей страницы или None).
+
+    У комментариев последнего показанного уровня, на которые есть
+    ответы, выставляется collapsed: их ответы подгружаются отдельно.
+    """
+    base = 0
+    if root is not None:
+        base = root.depth + 1
+        comments = comments.filter(
+            path__gt=root.path, path__lt=root.path + PATH_END
+        )
+    comments = comments.filter(depth__lt=base + depth)
+    if after:
+        comments = comments.filter(path__gt=after)
+    items = list(comments.order_by('path')[:limit + 1])
+    next_after = items[limit - 1].path if len(items) > limit else None
+    items = items[:limit]
+    for comment in items:
+        comment.collapsed = (
+            comment.depth == base + depth - 1 and comment.replies_count > 0
+        )
+    return items, next_after
+
+
+def reply_parent(post, parent_id):
+    """Комментарий поста, на который отвечают; None — новая ветка."""
+    if parent_id in (None, ''):
+        return None
+    try:
+        return post.comments.get(pk=parent_id)
+    except (ValueError, post.comments.model.DoesNotExist):
+        raise ValidationError('Комментарий для ответа не найден')
@@ -1,4 +1,6 @@
 from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
 
 POSTS_ON_PAGE = 10
 
@@ -7,3 +9,63 @@ def get_page_context(const, request):
     paginator = Paginator(const, POSTS_ON_PAGE)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def estimate_count(model, using='default'):
+    """Оценка числа строк в таблице без полного COUNT(*).
+
+    В SQLite это число строк из sqlite_stat1, которое обновляет
+    ANALYZE (см. analyze_table). MAX(rowid) не годится: он учитывает
+    удалённые строки, например перенесённые в архив посты. Без
+    статистики возвращается None, и считается точное число.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                    [model._meta.db_table]
+                )
+            except DatabaseError:
+                # ANALYZE ещё ни разу не запускался
+                return None
+            row = cursor.fetchone()
+            row = row and (int(row[0].split()[0]),)
+        else:
+            return None
+    if not row or not row[0] or row[0] < 0:
+        return None
+    return row[0]
+
+
+def analyze_table(model, using='default'):
+    """Обновляет статистику таблицы, по которой считает estimate_count."""
+    connection = connections[using]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {table}')
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для нефильтрованной выборки берёт оценку размера таблицы."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+        estimate = estimate_count(
+            self.object_list.model, self.object_list.db
+        )
+        if estimate is None:
+            return super().count
+        return estimate
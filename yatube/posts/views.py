@@ -1,64 +1,287 @@
+import json
+import time
+
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.views.decorators.cache import cache_page, never_cache
+from django.views.decorators.http import conditional_page
 
-from .models import Post, Group, User, Comment, Follow
+from .models import Post, PostRevision, User, Follow, GroupFollow
+from .archive import QuerySetChain, get_post_or_archived
+from .feeds import feed_pages, followed_feed
+from .following import get_followed_group_ids, get_following_ids
 from .forms import PostForm, CommentForm
-from .utils import get_page_context
+from .live import Subscription, live_feed
+from .lookups import get_author, get_group
+from .revisions import diff_html, revision_texts
+from .suggestions import get_suggestions
+from .threads import PATH_PATTERN, reply_parent, thread_page
+from .utils import POSTS_ON_PAGE, get_page_context
 
 CACHE_TIME = 20
+FOLLOW_STATE_LIMIT = 100
+FRAGMENT_TEMPLATE = 'posts/includes/feed_fragment.html'
+STREAM_KEEPALIVE = 15
+STREAM_LIFETIME = 5 * 60
+STREAM_RETRY = 5000
+
+
+def fragment_url(view_name, args, cursor):
+    return f'{reverse(view_name, args=args)}?cursor={cursor}'
+
+
+def next_fragment_url(page_obj, view_name, *args):
+    """Фрагмент, продолжающий страницу page_obj с её последнего поста."""
+    if not page_obj.has_next():
+        return None
+    last_post = page_obj[len(page_obj) - 1]
+    return fragment_url(view_name, args, feed_pages.cursor_for(last_post))
+
+
+def render_fragment(request, querysets, view_name, args=(), **flags):
+    """Только карточки постов и курсор следующей порции, без base.html."""
+    try:
+        posts, cursor = feed_pages.paginate_chain(
+            querysets, request, limit=POSTS_ON_PAGE
+        )
+    except ValidationError as error:
+        return HttpResponseBadRequest(error.message)
+    return fragment_response(request, posts, cursor, view_name, args, flags)
+
+
+def fragment_response(request, posts, cursor, view_name, args, flags):
+    context = {
+        'page_obj': posts,
+        'next_fragment_url': (
+            fragment_url(view_name, args, cursor) if cursor else None
+        ),
+        **flags,
+    }
+    response = render(request, FRAGMENT_TEMPLATE, context)
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+    return response
+
+
+def sse_event(event, event_id, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'
+
+
+def stream_events(request, subscription, since_id, cards, flags):
+    """Уведомления о новых постах; с cards — ещё и готовые карточки.
+    Через STREAM_LIFETIME поток закрывается, и EventSource
+    переподключается с Last-Event-ID, ничего не теряя."""
+    live_feed.subscribe(subscription, since_id)
+    try:
+        yield f'retry: {STREAM_RETRY}\n\n'
+        deadline = time.monotonic() + STREAM_LIFETIME
+        while time.monotonic() < deadline:
+            ids = live_feed.wait(subscription, min(
+                STREAM_KEEPALIVE, deadline - time.monotonic()
+            ))
+            if ids is None:
+                yield ': keepalive\n\n'
+                continue
+            data = {'count': len(ids), 'ids': ids}
+            if cards:
+                context = {
+                    'page_obj': Post.objects.select_related(
+                        'group', 'author'
+                    ).filter(pk__in=ids),
+                    **flags,
+                }
+                data['html'] = render_to_string(
+                    FRAGMENT_TEMPLATE, context, request
+                )
+            yield sse_event('posts', max(ids), data)
+    finally:
+        live_feed.unsubscribe(subscription)
+
+
+def stream_response(request, subscription, **flags):
+    try:
+        since_id = int(request.META.get('HTTP_LAST_EVENT_ID', ''))
+    except ValueError:
+        since_id = None
+    response = StreamingHttpResponse(
+        stream_events(
+            request, subscription, since_id, 'cards' in request.GET, flags
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @cache_page(CACHE_TIME, key_prefix='index_page')
 def index(request):
     post_list = Post.objects.select_related('group', 'author')
+    page_obj = get_page_context(post_list, request)
     context = {
-        'page_obj': get_page_context(post_list, request),
+        'page_obj': page_obj,
+        'next_fragment_url': next_fragment_url(
+            page_obj, 'posts:index_fragment'
+        ),
+        'stream_url': reverse('posts:index_stream'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page
+@cache_page(CACHE_TIME, key_prefix='index_fragment')
+def index_fragment(request):
+    return render_fragment(
+        request,
+        [Post.objects.select_related('group', 'author')],
+        'posts:index_fragment',
+        show_author_link=True,
+        show_group_link=True,
+        show_follow_button=True,
+    )
+
+
+def index_stream(request):
+    return stream_response(
+        request,
+        Subscription(),
+        show_author_link=True,
+        show_group_link=True,
+        show_follow_button=True,
+    )
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_group(slug)
     posts = group.posts.select_related('group', 'author')
+    page_obj = get_page_context(posts, request)
     context = {
-        'page_obj': get_page_context(posts, request),
+        'page_obj': page_obj,
         'group': group,
+        'group_following': group.pk in get_followed_group_ids(request.user),
+        'next_fragment_url': next_fragment_url(
+            page_obj, 'posts:group_fragment', slug
+        ),
+        'stream_url': reverse('posts:group_stream', args=[slug]),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page
+@cache_page(CACHE_TIME, key_prefix='group_fragment')
+def group_fragment(request, slug):
+    group = get_group(slug)
+    return render_fragment(
+        request,
+        [group.posts.select_related('group', 'author')],
+        'posts:group_fragment',
+        [slug],
+        show_author_link=True,
+        show_follow_button=True,
+    )
+
+
+def group_stream(request, slug):
+    group = get_group(slug)
+    return stream_response(
+        request,
+        Subscription(group_id=group.pk),
+        show_author_link=True,
+        show_follow_button=True,
+    )
+
+
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    author = get_author(username)
+    post_list = QuerySetChain(
+        author.posts.all(),
+        author.archived_posts.all(),
     )
+    following = author.pk in get_following_ids(request.user)
+    page_obj = get_page_context(post_list, request)
     context = {
         'author': author,
-        'page_obj': get_page_context(post_list, request),
-        'following': following
+        'page_obj': page_obj,
+        'following': following,
+        'next_fragment_url': next_fragment_url(
+            page_obj, 'posts:profile_fragment', username
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page
+@cache_page(CACHE_TIME, key_prefix='profile_fragment')
+def profile_fragment(request, username):
+    author = get_author(username)
+    return render_fragment(
+        request,
+        [
+            author.posts.select_related('group'),
+            author.archived_posts.select_related('group'),
+        ],
+        'posts:profile_fragment',
+        [username],
+    )
+
+
+def comment_thread_url(post, root, after):
+    args = [post.pk] if root is None else [post.pk, root.pk]
+    return f'{reverse("posts:comment_thread", args=args)}?after={after}'
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    post = get_post_or_archived(post_id)
+    form = None
+    if not post.is_archived:
+        form = CommentForm(request.POST or None)
+    comments, after = thread_page(post.comments.select_related('author'))
+    reply_to = request.GET.get('reply_to', '')
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'more_comments_url': (
+            comment_thread_url(post, None, after) if after else None
+        ),
+        'can_reply': form is not None,
+        'reply_to': reply_to if reply_to.isdigit() else None,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_thread(request, post_id, comment_id=None):
+    """Фрагмент ветки: следующая страница комментариев поста
+    или ответы на комментарий comment_id."""
+    post = get_post_or_archived(post_id)
+    comments = post.comments.select_related('author')
+    root = None
+    if comment_id is not None:
+        root = get_object_or_404(post.comments, pk=comment_id)
+    after = request.GET.get('after')
+    if after and not PATH_PATTERN.match(after):
+        return HttpResponseBadRequest('Некорректный параметр after')
+    comments, after = thread_page(comments, root, after)
+    context = {
+        'post': post,
+        'comments': comments,
+        'more_comments_url': (
+            comment_thread_url(post, root, after) if after else None
+        ),
+        'can_reply': not post.is_archived,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -96,27 +319,123 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@login_required
+def post_history(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    if request.user != post.author:
+        return redirect('posts:post_detail', post.id)
+    revisions = list(post.revisions.only('number', 'created'))
+    number = request.GET.get('revision', '')
+    if number.isdigit():
+        number = int(number)
+    else:
+        number = revisions[0].number if revisions else None
+    if number is None:
+        # пост не правили: история появляется с первой правкой
+        previous, text = None, post.text
+    else:
+        try:
+            previous, text = revision_texts(post.pk, number)
+        except PostRevision.DoesNotExist:
+            raise Http404
+    context = {
+        'post': post,
+        'revisions': revisions,
+        'number': number,
+        'diff': diff_html(previous, text),
+    }
+    return render(request, 'posts/post_history.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
+    try:
+        parent = reply_parent(post, request.POST.get('parent'))
+    except ValidationError:
+        raise Http404
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = parent
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    try:
+        posts, cursor = followed_feed(request.user, request, POSTS_ON_PAGE)
+    except ValidationError as error:
+        return HttpResponseBadRequest(error.message)
     context = {
-        'page_obj': get_page_context(posts, request),
+        # Страница одна: продолжение ленты открывается по курсору
+        'page_obj': Paginator(posts, POSTS_ON_PAGE).page(1),
+        'suggestions': get_suggestions(request.user),
+        'next_fragment_url': (
+            fragment_url('posts:follow_fragment', (), cursor)
+            if cursor else None
+        ),
+        'next_page_url': f'?cursor={cursor}' if cursor else None,
+        'stream_url': reverse('posts:follow_stream'),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@conditional_page
+@login_required
+def follow_fragment(request):
+    try:
+        posts, cursor = followed_feed(request.user, request, POSTS_ON_PAGE)
+    except ValidationError as error:
+        return HttpResponseBadRequest(error.message)
+    return fragment_response(
+        request, posts, cursor, 'posts:follow_fragment', (),
+        {'show_author_link': True, 'show_group_link': True},
+    )
+
+
+@login_required
+def follow_stream(request):
+    return stream_response(
+        request,
+        Subscription(
+            author_ids=get_following_ids(request.user),
+            group_ids=get_followed_group_ids(request.user),
+        ),
+        show_author_link=True,
+        show_group_link=True,
+    )
+
+
+def requested_author_ids(request):
+    author_ids = set()
+    values = request.GET.get('authors', '').split(',')
+    for value in values[:FOLLOW_STATE_LIMIT]:
+        try:
+            author_ids.add(int(value))
+        except ValueError:
+            continue
+    return author_ids
+
+
+@never_cache
+def follow_state(request):
+    """Подписки пользователя среди авторов ?authors=1,2,3.
+
+    Страницы лент и фрагменты кешируются общими для всех посетителей
+    и выводят кнопки подписки без состояния, а follow_buttons.js
+    заполняет их этим ответом.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse({'user': None, 'following': []})
+    following = get_following_ids(user) & requested_author_ids(request)
+    return JsonResponse({'user': user.pk, 'following': sorted(following)})
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -136,3 +455,17 @@ def profile_unfollow(request, username):
         author=author,
     ).delete()
     return redirect('posts:profile', username=author.username)
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_group(slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_posts', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = get_group(slug)
+    GroupFollow.objects.filter(user=request.user, group=group).delete()
+    return redirect('posts:group_posts', slug=slug)
@@ -0,0 +1,27 @@
+// Подгрузка ответов и следующих страниц ветки комментариев на месте.
+(function () {
+  'use strict';
+
+  document.addEventListener('click', function (event) {
+    var link = event.target.closest('.comments-more a');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    fetch(link.href, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        var template = document.createElement('template');
+        template.innerHTML = html;
+        link.closest('.comments-more').replaceWith(template.content);
+      })
+      .catch(function () {
+        window.location.href = link.href;
+      });
+  });
+})();
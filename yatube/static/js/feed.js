@@ -0,0 +1,47 @@
+// Бесконечная лента: «Показать ещё» подгружает следующую порцию карточек
+// из фрагмента вместо перезагрузки всей страницы.
+(function () {
+  'use strict';
+
+  function hidePagination() {
+    document.querySelectorAll('nav[aria-label="Page navigation"]')
+      .forEach(function (nav) { nav.hidden = true; });
+  }
+
+  function load(marker, button) {
+    button.disabled = true;
+    fetch(marker.dataset.nextUrl, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        var template = document.createElement('template');
+        template.innerHTML = '<hr>' + html;
+        var next = template.content.querySelector('.feed-next');
+        marker.replaceWith(template.content);
+        hidePagination();
+        if (window.updateFollowButtons) {
+          window.updateFollowButtons();
+        }
+        if (next) {
+          bind(next);
+        }
+      })
+      .catch(function () {
+        button.disabled = false;
+      });
+  }
+
+  function bind(marker) {
+    var button = marker.querySelector('button');
+    button.hidden = false;
+    button.addEventListener('click', function () {
+      load(marker, button);
+    });
+  }
+
+  document.querySelectorAll('.feed-next').forEach(bind);
+})();
@@ -0,0 +1,48 @@
+// Кнопки подписки на карточках. Ленты кешируются общими для всех,
+// поэтому подписки текущего пользователя запрашиваются отдельно.
+(function () {
+  'use strict';
+
+  var stateUrl = document.currentScript.dataset.stateUrl;
+
+  function update() {
+    var buttons = document.querySelectorAll('.follow-button:not([data-ready])');
+    if (!buttons.length) {
+      return;
+    }
+    var authors = {};
+    buttons.forEach(function (button) {
+      button.dataset.ready = '';
+      authors[button.dataset.authorId] = true;
+    });
+    fetch(stateUrl + '?authors=' + Object.keys(authors).join(','),
+          {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.json();
+      })
+      .then(function (state) {
+        if (state.user === null) {
+          return;
+        }
+        buttons.forEach(function (button) {
+          var authorId = Number(button.dataset.authorId);
+          if (authorId === state.user) {
+            return;
+          }
+          if (state.following.indexOf(authorId) !== -1) {
+            button.href = button.dataset.unfollowUrl;
+            button.textContent = 'Отписаться';
+            button.classList.replace('btn-primary', 'btn-light');
+          }
+          button.hidden = false;
+        });
+      })
+      .catch(function () {});
+  }
+
+  window.updateFollowButtons = update;
+  update();
+})();
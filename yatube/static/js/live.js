@@ -0,0 +1,17 @@
+// Уведомление о новых постах ленты по Server-Sent Events.
+(function () {
+  'use strict';
+
+  var notice = document.querySelector('.live-notice');
+  if (!notice || !window.EventSource) {
+    return;
+  }
+  var counter = notice.querySelector('.live-count');
+  var count = 0;
+  var source = new EventSource(notice.dataset.streamUrl);
+  source.addEventListener('posts', function (event) {
+    count += JSON.parse(event.data).count;
+    counter.textContent = count;
+    notice.hidden = false;
+  });
+})();
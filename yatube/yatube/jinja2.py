@@ -0,0 +1,50 @@
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.timezone import template_localtime
+from jinja2 import ChainableUndefined, Environment
+from sorl.thumbnail import get_thumbnail
+
+from core.templatetags.user_filters import addclass
+from posts.templatetags.post_cards import UrlPattern, card_image_urls
+
+
+def url(view_name, *args, **kwargs):
+    return reverse(view_name, args=args or None, kwargs=kwargs or None)
+
+
+def thumbnail(file_, geometry, **options):
+    if not file_:
+        return None
+    return get_thumbnail(file_, geometry, **options)
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def environment(**options):
+    """Окружение Jinja2 с фильтрами и тегами шаблонов Django.
+
+    Вывод экранируется через conditional_escape, а отсутствующие
+    переменные дают пустую строку, поэтому HTML совпадает с тем,
+    что рендерит шаблонизатор Django.
+    """
+    options['undefined'] = ChainableUndefined
+    options['finalize'] = conditional_escape
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'thumbnail': thumbnail,
+        'card_image_urls': card_image_urls,
+        'url_pattern': UrlPattern,
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'date': date,
+        'linebreaksbr': defaultfilters.linebreaksbr,
+        'truncatechars': defaultfilters.truncatechars,
+    })
+    return env
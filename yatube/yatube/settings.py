@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'posts.apps.PostsConfig',  # Добавленная запись
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,27 +50,35 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.server_timing.ServerTimingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+DEBUG_TOOLBAR = DEBUG and find_spec('debug_toolbar') is not None
+
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +93,26 @@ TEMPLATES = [
     },
 ]
 
+JINJA2_TEMPLATES_DIR = os.path.join(BASE_DIR, 'jinja2_templates')
+
+USE_JINJA2 = os.getenv('USE_JINJA2', 'False') == 'True'
+
+if find_spec('jinja2') is not None:
+    JINJA2_TEMPLATES = {
+        'BACKEND': 'core.jinja2_backend.TimedJinja2',
+        'NAME': 'jinja2',
+        'DIRS': [JINJA2_TEMPLATES_DIR],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'yatube.jinja2.environment',
+            'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+        },
+    }
+    if USE_JINJA2:
+        TEMPLATES.insert(0, JINJA2_TEMPLATES)
+    else:
+        TEMPLATES.append(JINJA2_TEMPLATES)
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 # Database
@@ -135,20 +165,62 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# письма сначала попадают в очередь, send_outbox доставляет их
+# через filebased.EmailBackend
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+THUMBNAIL_BACKEND = 'core.thumbnail.TimedThumbnailBackend'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_MAX_AGE = 60 * 60
+# 'X-Accel-Redirect' (nginx) или 'X-Sendfile' (Apache, lighttpd):
+# файл отдаёт веб-сервер, Django только проверяет запрос.
+MEDIA_ACCEL_HEADER = os.getenv('MEDIA_ACCEL_HEADER', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Кеш, общий для процессов: у LocMem он свой в каждом процессе,
+# поэтому версии закешированных объектов хранятся в файлах
+SHARED_CACHE_DIR = os.getenv(
+    'SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'shared_cache')
+)
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.InstrumentedFileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
 }
 
+# Сессии в кеше с записью в базу; срок продлевается, когда до его
+# истечения остаётся меньше SESSION_REFRESH_WINDOW секунд
+SESSION_ENGINE = 'core.session_backend'
+SESSION_REFRESH_WINDOW = 60 * 60 * 24 * 7
+USER_CACHE_TIMEOUT = 5 * 60
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Профилирование: доля запросов, профилируемых cProfile
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Метрики в формате Prometheus, общие для всех процессов
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Журнал запросов дольше SLOW_QUERY_THRESHOLD секунд
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.1))
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+
+# Копии базы команды backup_db
+BACKUP_DIR = os.path.join(BASE_DIR, 'backups')